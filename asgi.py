@@ -0,0 +1,10 @@
+"""
+ASGI entrypoint, live log streams are served from the event loop
+instead of holding a worker thread per viewer
+
+    uvicorn asgi:application --host 0.0.0.0 --port 80
+"""
+from src import app
+from src.appsrc.modules.sse import EventStreamDispatcher
+
+application = EventStreamDispatcher(app)
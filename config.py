@@ -7,12 +7,16 @@ APPLICATION_DESCRIPTION = "Welcome to CetaDash"
 APPLICATION_DETAILS = "A Flask-based homelab and Docker workflow automation multitool."
 
 TRUSTED_PROXY_IPS = ["172.18.0.*"]
+# Seconds a user authenticated from the proxy headers is cached for
+USER_CACHE_TTL = 300
 
 FOOTER_TEXT = "CetaDash Homelab Multitool"
 DEFAULT_DOMAIN = ""
 ENVIRONMENT = "test"
 TIMEZONE = "US/Pacific"
 DOWNLOADS_DIR = "downloads"
+# Threads serving requests when run with uvicorn asgi:application
+ASGI_THREADS = 24
 
 LOADING_SPLASH = """**Whale Sounds**"""
 # Databases
@@ -23,6 +27,8 @@ SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(os.getcwd(), "databases/us
 # Speeds up database
 SQLALCHEMY_TRACK_MODIFICATIONS=False
 # SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True}
+# Raise instead of logging when a page runs more queries than its budget
+QUERY_BUDGET_STRICT = False
 # Folder to output logs too
 LOGS_FOLDER = os.path.join(os.getcwd(), "logs")
 # File pattern to log to, will become app.log.1, app.log.2 etc when log grows too large
@@ -2,6 +2,7 @@ import os
 from flask import Blueprint, redirect, url_for
 from flask_login import current_user
 from .models import app, db, init_db
+from ...modules.docker_client import DockerClientManager
 from .blueprints import (
     tasks_blueprint,
     workflows_blueprint,
@@ -9,7 +10,14 @@ from .blueprints import (
     containers_blueprint,
     scheduler_blueprint,
     scripts_blueprint,
-    WorkflowScheduler
+    runs_blueprint,
+    WorkflowScheduler,
+    RunEngine,
+    WarmContainerPool,
+    ContainerIndex,
+    LogMultiplexer,
+    compact_run_logs,
+    purge_run_logs
 )
 
 blueprint = Blueprint(
@@ -27,10 +35,43 @@ blueprint.register_blueprint(tasks_blueprint,       url_prefix='/workflow/tasks'
 blueprint.register_blueprint(workflows_blueprint,   url_prefix='/workflow/workflows')
 blueprint.register_blueprint(triggers_blueprint,    url_prefix='/workflow/triggers')
 blueprint.register_blueprint(scheduler_blueprint,   url_prefix='/workflow/scheduler')
+blueprint.register_blueprint(runs_blueprint,        url_prefix='/workflow/runs')
+
+app.docker = DockerClientManager(
+    base_url=app.config.get("DOCKER_BASE_URL"),
+    pool_size=app.config.get("DOCKER_POOL_SIZE", 32),
+    timeout=app.config.get("DOCKER_TIMEOUT", 60),
+    health_interval=app.config.get("DOCKER_HEALTH_INTERVAL", 30)
+)
+app.container_index = ContainerIndex(app)
+app.log_multiplexer = LogMultiplexer(app)
+app.run_engine = RunEngine(app)
+app.warm_pool = WarmContainerPool(app)
 
 scheduler = WorkflowScheduler(app)
 app.docker_scheduler = scheduler
 
+app.task_manager.create_task(
+    "Compact Run Logs",
+    compact_run_logs,
+    interval=app.config.get("RUN_LOG_COMPACTION_INTERVAL", 5),
+    delay_startup=True
+)
+
+app.task_manager.create_task(
+    "Purge Run Logs",
+    purge_run_logs,
+    interval=app.config.get("RUN_LOG_PURGE_INTERVAL", 60),
+    delay_startup=True
+)
+
+app.task_manager.create_task(
+    "Prune Warm Containers",
+    app.warm_pool.prune,
+    interval=app.config.get("WARM_POOL_PRUNE_INTERVAL", 1),
+    delay_startup=True
+)
+
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
 def index():
@@ -4,6 +4,14 @@ from .triggers_blueprint import blueprint as triggers_blueprint
 from .containers_blueprint import blueprint as containers_blueprint
 from .scheduler_blueprint import blueprint as scheduler_blueprint, WorkflowScheduler
 from .scripts_blueprint import blueprint as scripts_blueprint
+from .runs_blueprint import blueprint as runs_blueprint
+from .run_engine import RunEngine, RunQueueFull
+from .execution_plan import ExecutionPlan, ExecutionPlanError, get_execution_plan, drop_execution_plans
+from .warm_pool import WarmContainerPool
+from .container_index import ContainerIndex
+from .log_multiplexer import LogMultiplexer
+from .log_storage import compact_run_logs
+from .log_retention import purge_run_logs
 __all__ = [
     "tasks_blueprint",
     "workflows_blueprint",
@@ -11,7 +19,19 @@ __all__ = [
     "containers_blueprint",
     "scheduler_blueprint",
     "scripts_blueprint",
-    "WorkflowScheduler"
+    "runs_blueprint",
+    "WorkflowScheduler",
+    "RunEngine",
+    "RunQueueFull",
+    "ExecutionPlan",
+    "ExecutionPlanError",
+    "get_execution_plan",
+    "drop_execution_plans",
+    "WarmContainerPool",
+    "ContainerIndex",
+    "LogMultiplexer",
+    "compact_run_logs",
+    "purge_run_logs"
 ]
 
 
@@ -0,0 +1,516 @@
+import os
+import re
+import time
+import logging
+import threading
+import ipaddress
+from contextlib import contextmanager
+import docker
+from ..models import app
+
+# ${VAR}, ${VAR:-default}, ${VAR-default}, ${VAR:?error}, $VAR, and $$ escapes
+INTERPOLATION_PATTERN = re.compile(
+    r"\$(?:(?P<escaped>\$)"
+    r"|\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)(?:(?P<op>:?[-?])(?P<arg>[^}]*))?\}"
+    r"|(?P<named>[A-Za-z_][A-Za-z0-9_]*))"
+)
+
+# Service keys passed straight through to containers.create
+PASSTHROUGH_KEYS = {
+    "hostname": "hostname",
+    "user": "user",
+    "working_dir": "working_dir",
+    "tty": "tty",
+    "stdin_open": "stdin_open",
+    "privileged": "privileged",
+    "cap_add": "cap_add",
+    "cap_drop": "cap_drop",
+    "dns": "dns",
+    "extra_hosts": "extra_hosts",
+    "mem_limit": "mem_limit",
+    "shm_size": "shm_size",
+    "stop_signal": "stop_signal",
+    "devices": "devices",
+}
+
+# Service keys handled explicitly
+HANDLED_KEYS = {
+    "image", "build", "container_name", "command", "entrypoint", "environment",
+    "env_file", "labels", "ports", "volumes", "networks", "network_mode",
+    "restart", "depends_on",
+}
+
+# Top level keys of a compose file, x- extension keys are also allowed
+TOP_LEVEL_KEYS = {"version", "name", "services", "networks", "volumes"}
+
+# depends_on conditions this engine honours, services are only started in order
+DEPENDS_ON_CONDITIONS = {"service_started"}
+
+
+class ComposeError(Exception):
+    """Raised when a compose file can't be brought up"""
+
+
+def interpolate(value, env:dict):
+    """Substitutes compose style variables in every string of a parsed compose file"""
+    if isinstance(value, dict):
+        return {k: interpolate(v, env) for k, v in value.items()}
+    if isinstance(value, list):
+        return [interpolate(v, env) for v in value]
+    if not isinstance(value, str):
+        return value
+
+    def substitute(match):
+        if match.group("escaped"):
+            return "$"
+        name = match.group("braced") or match.group("named")
+        op, arg = match.group("op"), match.group("arg") or ""
+        current = env.get(name)
+        if op == ":-" and not current:
+            return arg
+        if op == "-" and current is None:
+            return arg
+        if op in (":?", "?") and (current is None or (op == ":?" and not current)):
+            raise ComposeError(f"Required variable {name} is missing - {arg}")
+        return current or ""
+
+    return INTERPOLATION_PATTERN.sub(substitute, value)
+
+
+def read_env_file(path:str) -> dict:
+    """Reads KEY=VALUE lines from an env file"""
+    env = {}
+    if not os.path.exists(path):
+        return env
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and "=" in line and not line.startswith("#"):
+                key, value = line.split("=", 1)
+                env[key.strip()] = value.strip()
+    return env
+
+
+def parse_restart(value) -> dict:
+    if not value or value == "no":
+        return None
+    name, _, retries = str(value).partition(":")
+    policy = {"Name": name}
+    if retries:
+        policy["MaximumRetryCount"] = int(retries)
+    return policy
+
+
+def parse_port_range(value, port:str) -> list[int]:
+    """Parses a port or a start-end port range"""
+    start, _, stop = str(value).partition("-")
+    try:
+        start = int(start)
+        stop = int(stop) if stop else start
+    except ValueError:
+        raise ComposeError(f"Invalid port {port}")
+    if not 0 < start <= stop <= 65535:
+        raise ComposeError(f"Invalid port {port}")
+    return list(range(start, stop + 1))
+
+
+def parse_host_ip(value:str, port:str) -> str:
+    value = value.strip("[]")
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        raise ComposeError(f"Invalid host ip in port {port}")
+
+
+def parse_ports(ports:list) -> dict:
+    """
+    Converts compose port strings and mappings into the SDK's ports mapping
+    Supports ranges and IPv4 / IPv6 host ips, eg. "[::1]:8000-8001:80-81/udp"
+    """
+    mapping = {}
+    for port in ports or []:
+        if isinstance(port, dict):
+            if "target" not in port:
+                raise ComposeError(f"Port {port} has no target")
+            target = str(port["target"])
+            published = port.get("published")
+            published = None if published in (None, "") else str(published)
+            host_ip = port.get("host_ip")
+            protocol = port.get("protocol") or "tcp"
+        else:
+            spec, _, protocol = str(port).partition("/")
+            rest, _, target = spec.rpartition(":")
+            host_ip, _, published = rest.rpartition(":") if rest else ("", "", "")
+            published = published or None
+            protocol = protocol or "tcp"
+        targets = parse_port_range(target, port)
+        if published is None:
+            published_ports = [None] * len(targets)
+        else:
+            published_ports = parse_port_range(published, port)
+            if len(published_ports) != len(targets):
+                raise ComposeError(f"Port {port} maps ranges of different lengths")
+        host_ip = parse_host_ip(host_ip, port) if host_ip else None
+        for target, published in zip(targets, published_ports):
+            if host_ip:
+                binding = (host_ip, published) if published else (host_ip,)
+            else:
+                binding = published
+            key = f"{target}/{protocol}"
+            if key not in mapping:
+                mapping[key] = binding
+            elif isinstance(mapping[key], list):
+                mapping[key].append(binding)
+            else:
+                # The same container port published more than once
+                mapping[key] = [mapping[key], binding]
+    return mapping
+
+
+def parse_depends_on(service:str, depends_on) -> list[str]:
+    """Service names a service depends on, rejects conditions that can't be honoured"""
+    if not depends_on:
+        return []
+    if isinstance(depends_on, list):
+        return depends_on
+    for dependency, config in depends_on.items():
+        condition = (config or {}).get("condition", "service_started")
+        if condition not in DEPENDS_ON_CONDITIONS:
+            raise ComposeError(
+                f"Service {service} depends on {dependency} with unsupported condition {condition}"
+            )
+    return list(depends_on)
+
+
+def service_order(services:dict) -> list[str]:
+    """Orders services so dependencies are started first"""
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ComposeError(f"Service dependencies contain a cycle at {name}")
+        visiting.add(name)
+        for dependency in parse_depends_on(name, services[name].get("depends_on")):
+            if dependency not in services:
+                raise ComposeError(f"Service {name} depends on unknown service {dependency}")
+            visit(dependency)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in services:
+        visit(name)
+    return ordered
+
+
+class ComposeProject:
+    """
+    Brings up a parsed compose file with the Docker SDK.
+    Log streams are attached before containers start so no output is missed,
+    every step is timed and reported through write_log.
+    """
+    def __init__(self, name:str, compose:dict, project_dir:str, write_log:callable, client=None):
+        self.name = name
+        self.project_dir = project_dir
+        self.write_log = write_log
+        self.client = client or app.docker
+        env = {**os.environ, **read_env_file(os.path.join(project_dir, ".env"))}
+        self.compose = interpolate(compose or {}, env)
+        unsupported = {k for k in self.compose if not str(k).startswith("x-")} - TOP_LEVEL_KEYS
+        if unsupported:
+            raise ComposeError(f"Unsupported compose keys: {', '.join(sorted(unsupported))}")
+        self.services = self.compose.get("services") or {}
+        if not self.services:
+            raise ComposeError("Compose file has no services")
+        for service, config in self.services.items():
+            unsupported = {
+                k for k in config or {} if not str(k).startswith("x-")
+            } - HANDLED_KEYS - set(PASSTHROUGH_KEYS)
+            if unsupported:
+                raise ComposeError(
+                    f"Unsupported keys for service {service}: {', '.join(sorted(unsupported))}, "
+                    f"set COMPOSE_ENGINE to \"cli\" to use them"
+                )
+        self.containers = []
+        self.networks = {}
+        self.created_networks = []
+        self.timings = []
+        self._log_threads = []
+
+    @contextmanager
+    def step(self, label:str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings.append((label, elapsed))
+            self.write_log(f"🖥️⏱️ {label} - {elapsed * 1000:.0f}ms")
+
+    def labels(self, service:str = None) -> dict:
+        labels = {"com.docker.compose.project": self.name}
+        if service:
+            labels["com.docker.compose.service"] = service
+        return labels
+
+    def up(self) -> list:
+        """Creates networks, volumes, and containers, returns the started containers"""
+        with self.step("Compose up"):
+            with self.step("Create networks"):
+                self.create_networks()
+            with self.step("Create volumes"):
+                self.create_volumes()
+            for service in service_order(self.services):
+                self.up_service(service, self.services[service])
+        return self.containers
+
+    def network_name(self, key:str) -> str:
+        config = (self.compose.get("networks") or {}).get(key) or {}
+        if config.get("external"):
+            return config.get("name") or key
+        return config.get("name") or f"{self.name}_{key}"
+
+    def get_network(self, key:str):
+        if key in self.networks:
+            return self.networks[key]
+        name = self.network_name(key)
+        config = (self.compose.get("networks") or {}).get(key) or {}
+        try:
+            network = self.client.networks.get(name)
+        except docker.errors.NotFound:
+            if config.get("external"):
+                raise ComposeError(f"External network {name} not found")
+            network = self.client.networks.create(
+                name,
+                driver=config.get("driver", "bridge"),
+                labels=self.labels(),
+                internal=bool(config.get("internal"))
+            )
+            self.created_networks.append(network)
+            self.write_log(f"🐳🌐 Created network {name}")
+        self.networks[key] = network
+        return network
+
+    def create_networks(self) -> None:
+        for key in self.compose.get("networks") or {}:
+            self.get_network(key)
+
+    def volume_name(self, key:str) -> str:
+        config = (self.compose.get("volumes") or {}).get(key) or {}
+        if config.get("external"):
+            return config.get("name") or key
+        return config.get("name") or f"{self.name}_{key}"
+
+    def create_volumes(self) -> None:
+        for key, config in (self.compose.get("volumes") or {}).items():
+            config = config or {}
+            name = self.volume_name(key)
+            try:
+                self.client.volumes.get(name)
+            except docker.errors.NotFound:
+                if config.get("external"):
+                    raise ComposeError(f"External volume {name} not found")
+                self.client.volumes.create(
+                    name,
+                    driver=config.get("driver", "local"),
+                    labels=self.labels()
+                )
+                self.write_log(f"🐳📂 Created volume {name}")
+
+    def parse_volumes(self, volumes:list) -> dict:
+        mapping = {}
+        for volume in volumes or []:
+            if isinstance(volume, dict):
+                source, target = volume.get("source"), volume["target"]
+                mode = "ro" if volume.get("read_only") else "rw"
+                bind = volume.get("type") == "bind"
+            else:
+                parts = str(volume).split(":")
+                if len(parts) == 1:
+                    # Anonymous volume
+                    mapping.setdefault("__anonymous__", []).append(parts[0])
+                    continue
+                source, target = parts[0], parts[1]
+                mode = parts[2] if len(parts) > 2 else "rw"
+                bind = source.startswith((".", "/", "~"))
+            if bind:
+                source = os.path.abspath(os.path.join(self.project_dir, os.path.expanduser(source)))
+            else:
+                source = self.volume_name(source)
+            mapping[source] = {"bind": target, "mode": mode}
+        return mapping
+
+    def environment(self, config:dict) -> dict:
+        env = {}
+        env_files = config.get("env_file") or []
+        if isinstance(env_files, str):
+            env_files = [env_files]
+        for env_file in env_files:
+            if isinstance(env_file, dict):
+                env_file = env_file["path"]
+            env.update(read_env_file(os.path.join(self.project_dir, env_file)))
+        environment = config.get("environment") or {}
+        if isinstance(environment, list):
+            for item in environment:
+                key, sep, value = str(item).partition("=")
+                if sep:
+                    env[key] = value
+                elif key in os.environ:
+                    env[key] = os.environ[key]
+        else:
+            env.update({k: "" if v is None else str(v) for k, v in environment.items()})
+        return env
+
+    def ensure_image(self, service:str, config:dict) -> str:
+        build = config.get("build")
+        image = config.get("image") or f"{self.name}-{service}"
+        try:
+            self.client.images.get(image)
+            return image
+        except docker.errors.ImageNotFound:
+            pass
+        if build:
+            if isinstance(build, str):
+                build = {"context": build}
+            with self.step(f"Build {service}"):
+                stream = self.client.api.build(
+                    path=os.path.join(self.project_dir, build.get("context", ".")),
+                    dockerfile=build.get("dockerfile", "Dockerfile"),
+                    target=build.get("target"),
+                    buildargs=build.get("args"),
+                    tag=image,
+                    rm=True,
+                    decode=True
+                )
+                for chunk in stream:
+                    if chunk.get("error"):
+                        raise ComposeError(f"Failed to build {service} - {chunk['error'].strip()}")
+                    if chunk.get("stream", "").strip():
+                        self.write_log("🐳🔨 " + chunk["stream"].strip())
+        else:
+            with self.step(f"Pull {image}"):
+                self.write_log(f"🐳⬇️ Pulling image {image}")
+                self.client.images.pull(image)
+        return image
+
+    def create_kwargs(self, service:str, config:dict) -> tuple[dict, list]:
+        """Maps a service definition to containers.create arguments and extra networks"""
+        labels = config.get("labels") or {}
+        if isinstance(labels, list):
+            labels = dict(str(label).partition("=")[::2] for label in labels)
+        kwargs = {
+            "name": config.get("container_name") or f"{self.name}-{service}-1",
+            "command": config.get("command"),
+            "entrypoint": config.get("entrypoint"),
+            "environment": self.environment(config),
+            "labels": {**labels, **self.labels(service)},
+            "ports": parse_ports(config.get("ports")),
+            "restart_policy": parse_restart(config.get("restart")),
+        }
+        for key, argument in PASSTHROUGH_KEYS.items():
+            if key in config:
+                kwargs[argument] = config[key]
+        volumes = self.parse_volumes(config.get("volumes"))
+        anonymous = volumes.pop("__anonymous__", [])
+        if volumes:
+            kwargs["volumes"] = volumes
+        if anonymous:
+            kwargs["mounts"] = [docker.types.Mount(target, None, type="volume") for target in anonymous]
+        extra_networks = []
+        if config.get("network_mode"):
+            kwargs["network_mode"] = config["network_mode"]
+        else:
+            networks = config.get("networks") or ["default"]
+            keys = list(networks)
+            kwargs["network"] = self.get_network(keys[0]).name
+            extra_networks = keys[1:]
+        return {k: v for k, v in kwargs.items() if v not in (None, {}, [])}, extra_networks
+
+    def up_service(self, service:str, config:dict) -> None:
+        image = self.ensure_image(service, config)
+        kwargs, extra_networks = self.create_kwargs(service, config)
+        name = kwargs["name"]
+        with self.step(f"Create {name}"):
+            try:
+                existing = self.client.containers.get(name)
+            except docker.errors.NotFound:
+                existing = None
+            if existing is not None:
+                # Only containers left over from this project are replaced
+                if existing.labels.get("com.docker.compose.project") != self.name:
+                    raise ComposeError(
+                        f"Container name {name} is already in use by a container outside project {self.name}"
+                    )
+                existing.remove(force=True)
+                self.write_log(f"🐳🗑️ Removed existing container {name}")
+            container = self.client.containers.create(image, **kwargs)
+            for key in extra_networks:
+                self.get_network(key).connect(container, aliases=[service])
+        self.containers.append(container)
+        self.attach(container)
+        with self.step(f"Start {name}"):
+            container.start()
+
+    def attach(self, container) -> None:
+        """Streams a container's output, attached before start so the first lines are kept"""
+        stream = self.client.api.attach(
+            container.id,
+            stdout=True,
+            stderr=True,
+            stream=True,
+            logs=True
+        )
+        # attach keeps the client's read timeout, quiet containers would drop their stream
+        api = self.client.api
+        api._disable_socket_timeout(api._get_raw_response_socket(stream._response))
+
+        def follow():
+            pending = ""
+            try:
+                for chunk in stream:
+                    pending += chunk.decode("utf-8", errors="replace")
+                    *lines, pending = pending.split("\n")
+                    for line in lines:
+                        self.write_log(f"🐳🧾 [{container.name}]: {line}".strip())
+                if pending:
+                    self.write_log(f"🐳🧾 [{container.name}]: {pending}".strip())
+            except Exception as e:
+                self.write_log(f"🖥️❌ Lost logs for {container.name}: {e}")
+
+        self.write_log(f"🖥️⛓️ Attaching to logs for {container.name}.")
+        thread = threading.Thread(target=follow, daemon=True)
+        thread.start()
+        self._log_threads.append(thread)
+
+    def wait(self) -> dict:
+        """Waits for every container to exit and returns their exit codes"""
+        exit_codes = {}
+        with self.step("Run"):
+            for container in self.containers:
+                try:
+                    exit_codes[container.name] = container.wait().get("StatusCode")
+                except Exception as e:
+                    self.write_log(f"🖥️❌ Failed waiting for {container.name}: {e}")
+            for thread in self._log_threads:
+                thread.join()
+        return exit_codes
+
+    def down(self) -> None:
+        """Removes containers and the networks this project created"""
+        with self.step("Cleanup"):
+            for container in self.containers:
+                self.write_log(f"🐳🗑️ Removing container {container.name}")
+                try:
+                    container.remove(force=True)
+                except docker.errors.NotFound:
+                    pass
+            for network in self.created_networks:
+                try:
+                    network.remove()
+                except docker.errors.APIError as e:
+                    logging.error(f"Failed to remove network {network.name} - {e}")
+
+    def summary(self) -> str:
+        return ", ".join(f"{label} {elapsed * 1000:.0f}ms" for label, elapsed in self.timings)
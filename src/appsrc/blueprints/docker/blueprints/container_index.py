@@ -0,0 +1,110 @@
+import time
+import atexit
+import logging
+import threading
+
+# Event actions that only change a container's state
+STATE_ACTIONS = {
+    "start": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "die": "exited",
+    "oom": "exited",
+}
+
+# Event actions that need the container to be listed again
+REFRESH_ACTIONS = {"create", "rename", "update"}
+
+
+class ContainerIndex:
+    """
+    In memory index of the daemon's containers.
+    Bootstrapped with one list call, then kept current from the events stream,
+    entries have the same shape as the low level API's container list.
+    """
+    def __init__(self, app, retry:int = None):
+        self.app = app
+        self.retry = retry or app.config.get("CONTAINER_INDEX_RETRY", 5)
+        self.containers = {}
+        self.ready = False
+        self.updated_at = None
+        self._events = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cetadash-container-index", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _list(self, **filters) -> list[dict]:
+        return self.app.docker.api.containers(all=True, filters=filters or None)
+
+    def bootstrap(self) -> None:
+        containers = {c["Id"]: c for c in self._list()}
+        with self._lock:
+            self.containers = containers
+            self.updated_at = time.time()
+            self.ready = True
+
+    def refresh(self, container_id:str) -> None:
+        found = self._list(id=container_id)
+        with self._lock:
+            if found:
+                self.containers[container_id] = found[0]
+            else:
+                self.containers.pop(container_id, None)
+
+    def apply(self, event:dict) -> None:
+        """Updates the index from a single container event"""
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        container_id = event.get("id") or event.get("Actor", {}).get("ID")
+        if not container_id:
+            return
+        if action == "destroy":
+            with self._lock:
+                self.containers.pop(container_id, None)
+        elif action in REFRESH_ACTIONS or container_id not in self.containers:
+            self.refresh(container_id)
+        elif action in STATE_ACTIONS:
+            with self._lock:
+                if container := self.containers.get(container_id):
+                    container["State"] = STATE_ACTIONS[action]
+        else:
+            return
+        self.updated_at = time.time()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                # Events are requested from before the list call so none are missed
+                since = int(time.time())
+                self.bootstrap()
+                self._events = self.app.docker.api.events(
+                    since=since,
+                    filters={"type": "container"},
+                    decode=True
+                )
+                for event in self._events:
+                    self.apply(event)
+            except Exception as e:
+                if self._stopping.is_set():
+                    return
+                logging.error(f"Container index lost the docker events stream - {e}")
+            self.ready = False
+            self._stopping.wait(self.retry)
+
+    def list(self) -> list[dict]:
+        """Indexed containers sorted by name, lists from the daemon until the index is ready"""
+        if self.ready:
+            with self._lock:
+                containers = list(self.containers.values())
+        else:
+            containers = self._list()
+        return sorted(containers, key=lambda c: c["Names"][0] if c.get("Names") else c["Id"])
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._events is not None:
+            try:
+                self._events.close()
+            except Exception:
+                pass
@@ -2,15 +2,14 @@ import os
 import docker
 import datetime
 import threading
-import queue
 from flask import (
     Blueprint,
     Response,
+    jsonify,
     render_template,
     redirect,
     url_for,
-    flash,
-    stream_with_context
+    flash
 )
 from flask_login import current_user
 from ..models import (
@@ -23,6 +22,8 @@ from ..models import (
     STATUS_ENUM
 )
 from ....modules.parsing import make_table_page
+from ....modules.streams import Subscription
+from ....modules.sse import EventStream, event_stream_view, DROPPED_MESSAGE
 
 
 
@@ -70,10 +71,8 @@ ACTION_MAP = {
 
 def action_worker(action, container_id, result_queue) -> None:
     try:
-        result_queue.put("🖥️🔗 Connecting to Docker engine")
-        client = docker.from_env()
         result_queue.put(f"🖥️🔗 Fetching container {container_id}")
-        container = client.containers.get(container_id)
+        container = app.docker.containers.get(container_id)
     except docker.errors.DockerException as e:
         result_queue.put(f"🖥️❌ Failed to get container: {str(e)}")
         return
@@ -98,11 +97,19 @@ def action_worker(action, container_id, result_queue) -> None:
 
     if status and action in ["start_container", "restart_container"]:
         result_queue.put(f"🖥️🔗 Attaching to logs for container '{container.name}'")
+        subscription = app.log_multiplexer.subscribe(container.id)
         try:
-            for log in container.logs(stream=True, follow=True, tail=1000):
-                result_queue.put(f"🐳🧾 {log.decode('utf-8')}")
-        except Exception as e:
-            result_queue.put(f"🖥️❌ Failed to attach to logs: {str(e)}")
+            # Checked on every wake up so a quiet container stops being followed once the viewer has gone
+            while not result_queue.closed:
+                items = subscription.get(timeout=1)
+                if not items and subscription.finished:
+                    break
+                if dropped := subscription.take_dropped():
+                    result_queue.put(DROPPED_MESSAGE.format(dropped))
+                for _, line in items:
+                    result_queue.put(f"🐳🧾 {line}")
+        finally:
+            subscription.close()
 
     result_queue.put("🖥️✅ TASK COMPLETE, DISCONNECTING\n")
 
@@ -110,8 +117,7 @@ def action_worker(action, container_id, result_queue) -> None:
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
 def index():
-    client = docker.APIClient()
-    containers = client.containers(all=True)
+    containers = app.container_index.list()
     container_actions = {
         "start_container":("Start", "play"),
         "stop_container":("Stop", "stop"),
@@ -199,38 +205,51 @@ def index():
 
 
 
+@blueprint.route('/state', methods=['GET'])
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+def state():
+    index = app.container_index
+    return jsonify({
+        "ready": index.ready,
+        "updated_at": index.updated_at,
+        "containers": [
+            {
+                "id": container["Id"],
+                "names": [name.strip("/") for name in container.get("Names") or []],
+                "state": container.get("State"),
+                "image": container.get("Image"),
+                "labels": container.get("Labels") or {},
+            }
+            for container in index.list()
+        ],
+        "log_followers": app.log_multiplexer.status()
+    })
+
+
 @blueprint.route('/container/<container_id>/view', methods=['GET', 'POST'])
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
 def view(container_id):
-    client = docker.from_env()
-    obj = client.containers.get(container_id)
+    obj = app.docker.containers.get(container_id)
     container = obj.attrs
     return render_template("container/view.html", container=obj, container_data=obj.attrs)
 
 
 @blueprint.route('/container/<container_id>/action/<action>', methods=['GET', 'POST'])
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@event_stream_view
 def action(container_id, action):
     if action not in ACTION_MAP:
         return Response(f"✅❌ Failed: Unknown container action: {action}", mimetype='text/event-stream')
 
-    result_queue = queue.Queue()
-    thread = threading.Thread(target=action_worker, args=(action, container_id, result_queue), daemon=True)
-    thread.start()
-
-    @stream_with_context
-    def generate():
-        yield "data: 🖥️▶️ Starting task...\n\n"
-
-        while True:
-            try:
-                line = result_queue.get(timeout=0.05)
-                yield "data: "+line+"\n\n"
-            except queue.Empty:
-                if not thread.is_alive():
-                    break
-
-    return Response(generate(), mimetype='text/event-stream')
+    # The worker is the only source, the stream ends when it returns
+    result_queue = Subscription(sources=1)
+    def worker():
+        try:
+            action_worker(action, container_id, result_queue)
+        finally:
+            result_queue.source_closed()
+    threading.Thread(target=worker, daemon=True).start()
+    return EventStream(result_queue, prelude=["🖥️▶️ Starting task..."]).response()
 
 
 @blueprint.route('/container/<container_id>/action_frame/<action>', methods=['GET', 'POST'])
@@ -241,30 +260,13 @@ def actionframe(container_id, action):
 
 @blueprint.route('/container/<container_id>/logs', methods=['GET', 'POST'])
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@event_stream_view
 def logs(container_id):
-    def log_streamer(container_id, log_queue, tail=100):
-        try:
-            client = docker.from_env()
-            container = client.containers.get(container_id)
-            for log in container.logs(stream=True, follow=True, tail=tail):
-                log_queue.put(log.decode("utf-8"))
-        except Exception as e:
-            log_queue.put(f"data: 🖥️❌ Error: {str(e)}")
-
-    log_queue = queue.Queue()
-    thread = threading.Thread(target=log_streamer, args=(container_id, log_queue), daemon=True)
-    thread.start()
-    @stream_with_context
-    def generate():
-        while True:
-            try:
-                line = log_queue.get(timeout=1)
-                if line:
-                    yield f'data: {line}\n\n'
-            except queue.Empty:
-                if not thread.is_alive():
-                    break
-    return Response(generate(), mimetype='text/event-stream')
+    # Viewers share one follower per container, slow viewers drop lines instead of blocking it
+    return EventStream(
+        app.log_multiplexer.subscribe(container_id),
+        format_item=lambda item: item[1]
+    ).response()
 
 
 @blueprint.route('/container/<container_id>/logs_frame', methods=['GET', 'POST'])
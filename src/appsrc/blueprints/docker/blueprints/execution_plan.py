@@ -0,0 +1,114 @@
+import threading
+from jinja2 import TemplateError
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from ....models import edited
+from ..models import app, db, Workflow, WorkflowTask, WorkflowTaskAssociation, WorkflowScript
+from .trigger_handling import build_layered_environment, build_task_graph, compile_template
+
+
+class ExecutionPlanError(Exception):
+    """Raised when a workflow can't be planned, eg. its task dependencies have a cycle"""
+
+
+class ExecutionPlan:
+    """
+    Everything a run needs from a workflow, loaded once and shared by its runs.
+    The workflow, tasks, and scripts are detached copies, treat them as read only.
+    environments holds each task's script > task > workflow layers, the trigger
+    layer is applied per run. templates holds compiled templates of compose tasks.
+    """
+    def __init__(self, workflow:Workflow, tasks:list[WorkflowTask], graph:dict[int, set[int]]):
+        self.workflow = workflow
+        self.tasks = tasks
+        self.graph = graph
+        self.environments = {}
+        self.templates = {}
+        for task in tasks:
+            self.environments[task.id] = build_layered_environment(workflow, task)
+            if not task.use_script:
+                self.templates[task.id] = compile_template(task.template or "")
+
+    @classmethod
+    def load(cls, workflow_id:int) -> "ExecutionPlan":
+        """
+        Loads a workflow's plan in its own session, None if the workflow doesn't exist
+        Raises ExecutionPlanError if its dependencies or templates are invalid
+        """
+        with app.app_context():
+            workflow = db.session.get(Workflow, workflow_id)
+            if workflow is None:
+                return None
+            associations = (
+                workflow.task_associations
+                .options(joinedload(WorkflowTaskAssociation.task).joinedload(WorkflowTask.script))
+                .order_by(WorkflowTaskAssociation.priority.asc())
+                .all()
+            )
+            tasks = [assoc.task for assoc in associations if assoc.task is not None]
+            try:
+                graph = build_task_graph(workflow, tasks)
+            except ValueError as e:
+                raise ExecutionPlanError(f"Workflow {workflow.name} ({workflow_id}) - {e}") from e
+            # Detached so the plan outlives this session, loaded attributes are kept
+            db.session.expunge_all()
+        try:
+            return cls(workflow, tasks, graph)
+        except TemplateError as e:
+            raise ExecutionPlanError(f"Workflow {workflow.name} ({workflow_id}) - invalid template - {e}") from e
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+_generation = 0
+
+
+def get_execution_plan(workflow_id:int) -> ExecutionPlan:
+    """
+    Cached execution plan of a workflow, built on first use after an edit
+    Raises ExecutionPlanError if the workflow can't be planned
+    """
+    workflow_id = int(workflow_id)
+    with _plans_lock:
+        if (plan := _plans.get(workflow_id)) is not None:
+            return plan
+        generation = _generation
+    plan = ExecutionPlan.load(workflow_id)
+    with _plans_lock:
+        # A plan loaded while an edit was being saved may be stale, it's used but not kept
+        if plan is not None and generation == _generation:
+            _plans[workflow_id] = plan
+    return plan
+
+
+def drop_execution_plans(workflow_id:int = None) -> None:
+    """Drops one workflow's plan, or every plan"""
+    global _generation
+    with _plans_lock:
+        _generation += 1
+        if workflow_id is None:
+            _plans.clear()
+        else:
+            _plans.pop(int(workflow_id), None)
+
+
+@edited.connect
+def invalidate(sender, action:int = None, **kw) -> None:
+    """
+    Drops plans when a workflow, task, or script edit is logged.
+    Edits are logged before they're committed, so plans are dropped again after the commit.
+    """
+    if isinstance(sender, Workflow):
+        workflow_id = sender.id
+    elif isinstance(sender, (WorkflowTask, WorkflowScript)):
+        # Tasks and scripts can be shared by workflows, drop every plan
+        workflow_id = None
+    else:
+        return
+    drop_execution_plans(workflow_id)
+    event.listen(
+        db.session(),
+        "after_commit",
+        lambda session: drop_execution_plans(workflow_id),
+        once=True
+    )
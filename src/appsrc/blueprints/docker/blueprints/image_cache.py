@@ -0,0 +1,188 @@
+import os
+import shutil
+import datetime
+import hashlib
+import logging
+import threading
+import docker
+from sqlalchemy.exc import IntegrityError
+from ..models import app, db, ScriptImage
+
+
+def script_image_digest(language:str, dockerfile_template:str, dependencies:str, script:str) -> str:
+    """Hashes everything that ends up in a script's image"""
+    digest = hashlib.sha256()
+    for part in (language, dockerfile_template, dependencies, script):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def script_image_tag(digest:str) -> str:
+    return f"{app.config.get('SCRIPT_IMAGE_REPOSITORY', 'cetadash-script')}:{digest}"
+
+
+def script_base_image_tag(digest:str) -> str:
+    return f"{app.config.get('SCRIPT_BASE_IMAGE_REPOSITORY', 'cetadash-script-base')}:{digest}"
+
+
+def image_size(image, base_tag:str = None) -> int:
+    """
+    Size of an image's own layers, script images are built on a shared base image
+    whose layers are counted once with the base's own entry
+    """
+    size = image.attrs.get("Size", 0)
+    if base_tag:
+        try:
+            size -= app.docker.images.get(base_tag).attrs.get("Size", 0)
+        except docker.errors.ImageNotFound:
+            pass
+    return max(size, 0)
+
+
+def save_script_image(digest:str, tag:str, update:callable, **values) -> None:
+    """
+    Creates or updates the cache entry of a digest in the current session,
+    when runs build the same digest at once the later insert fails and updates the earlier row
+    """
+    for _ in range(2):
+        entry = ScriptImage.query.filter_by(digest=digest).first()
+        if entry is None:
+            entry = ScriptImage(digest=digest, tag=tag, hits=0, **values)
+            db.session.add(entry)
+        update(entry)
+        try:
+            db.session.commit()
+            return
+        except IntegrityError:
+            db.session.rollback()
+    logging.error(f"Failed to record script image {tag}")
+
+
+def lookup_script_image(digest:str, tag:str = None, base_tag:str = None) -> bool:
+    """
+    Returns True if the image for a digest exists locally,
+    cache hits are recorded so eviction can drop the least recently used images
+    """
+    tag = tag or script_image_tag(digest)
+    with app.app_context():
+        entry = ScriptImage.query.filter_by(digest=digest).first()
+        try:
+            image = app.docker.images.get(tag)
+        except docker.errors.ImageNotFound:
+            if entry:
+                db.session.delete(entry)
+                db.session.commit()
+            return False
+
+        size = image_size(image, base_tag)
+
+        def update(entry):
+            entry.hits += 1
+            entry.size = size
+            entry.last_used_at = datetime.datetime.utcnow()
+
+        save_script_image(digest, tag, update)
+        return True
+
+
+def record_script_image(digest:str, language:str, tag:str = None, base_tag:str = None) -> None:
+    """Records a freshly built image and evicts old ones if the cache is too large"""
+    tag = tag or script_image_tag(digest)
+    try:
+        image = app.docker.images.get(tag)
+    except docker.errors.ImageNotFound:
+        logging.error(f"Built script image {tag} not found")
+        return
+
+    def update(entry):
+        entry.size = image_size(image, base_tag)
+        entry.last_used_at = datetime.datetime.utcnow()
+
+    with app.app_context():
+        save_script_image(digest, tag, update, language=language)
+    evict_script_images(keep=[digest])
+
+
+_base_locks = {}
+_base_locks_lock = threading.Lock()
+
+
+def ensure_base_image(
+    digest:str,
+    language:str,
+    base_template:str,
+    dependencies:str,
+    write_log:callable
+) -> str:
+    """
+    Builds the shared dependency image for a digest unless it already exists
+    Concurrent runs needing the same base image wait for a single build
+    """
+    tag = script_base_image_tag(digest)
+    with _base_locks_lock:
+        lock = _base_locks.setdefault(digest, threading.Lock())
+    with lock:
+        if lookup_script_image(digest, tag):
+            write_log(f"🖥️📦 Using cached dependency image {digest[:12]}")
+            return tag
+        write_log(f"🖥️🧱 Building dependency image {digest[:12]}")
+        build_dir = f"/cetadash-compose/base-{digest}"
+        os.makedirs(build_dir, exist_ok=True)
+        try:
+            with open(os.path.join(build_dir, "Dockerfile"), "w+") as f:
+                f.write(base_template)
+            with open(os.path.join(build_dir, "requirements.txt"), "w+") as f:
+                f.write(dependencies or "")
+            for chunk in app.docker.api.build(path=build_dir, tag=tag, rm=True, decode=True):
+                if chunk.get("error"):
+                    raise ValueError(f"Dependency image build failed - {chunk['error'].strip()}")
+                if chunk.get("stream", "").strip():
+                    write_log("🐳🧱 " + chunk["stream"].strip())
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        record_script_image(digest, language, tag=tag)
+    return tag
+
+
+def evict_script_images(max_bytes:int = None, keep:list = ()) -> int:
+    """
+    Removes least recently used script images until the cache fits in max_bytes
+    Images used within SCRIPT_IMAGE_EVICTION_GRACE are kept, a run that just looked one up
+    may not have started its containers yet
+    """
+    max_bytes = max_bytes or app.config.get("SCRIPT_IMAGE_CACHE_MAX_BYTES", 10 * 1024**3)
+    in_use = datetime.datetime.utcnow() - datetime.timedelta(
+        minutes=app.config.get("SCRIPT_IMAGE_EVICTION_GRACE", 30)
+    )
+    removed = 0
+    with app.app_context():
+        total = db.session.query(db.func.coalesce(db.func.sum(ScriptImage.size), 0)).scalar()
+        if total <= max_bytes:
+            return 0
+        entries = (
+            ScriptImage.query
+            .filter(ScriptImage.last_used_at < in_use)
+            .order_by(ScriptImage.last_used_at.asc())
+            .all()
+        )
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            if entry.digest in keep:
+                continue
+            try:
+                app.docker.images.remove(entry.tag)
+            except docker.errors.ImageNotFound:
+                pass
+            except docker.errors.APIError as e:
+                # Still used by a container
+                logging.info(f"Skipping eviction of script image {entry.tag} - {e}")
+                continue
+            total -= entry.size
+            removed += 1
+            db.session.delete(entry)
+        db.session.commit()
+    if removed:
+        logging.info(f"Evicted {removed} script images")
+    return removed
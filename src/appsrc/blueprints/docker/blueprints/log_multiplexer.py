@@ -0,0 +1,84 @@
+import logging
+import threading
+from ....modules.streams import Broadcaster, Subscription
+
+
+class LogMultiplexer:
+    """
+    Follows each container's logs once and fans (container name, line) pairs
+    out to every subscriber. Following stops when the last subscriber leaves
+    or the container exits, late subscribers are replayed the last tail lines.
+    """
+    def __init__(self, app, tail:int = None, buffer:int = None):
+        self.app = app
+        self.tail = tail or app.config.get("LOG_FOLLOW_TAIL", 100)
+        self.buffer = buffer or app.config.get("LOG_FOLLOW_BUFFER", 1000)
+        self.followers = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, container_id:str, subscription:Subscription = None) -> Subscription:
+        """Subscribes to a container's logs, pass a subscription to follow several containers with it"""
+        with self._lock:
+            broadcaster = self.followers.get(container_id)
+            if broadcaster is None or broadcaster.closed:
+                broadcaster = Broadcaster(history=self.tail, on_empty=self._idle)
+                broadcaster.container_id = container_id
+                self.followers[container_id] = broadcaster
+                threading.Thread(
+                    target=self._follow,
+                    args=(container_id, broadcaster),
+                    name=f"cetadash-logs-{container_id[:12]}",
+                    daemon=True
+                ).start()
+            return broadcaster.subscribe(subscription, maxlen=self.buffer)
+
+    def _follow(self, container_id:str, broadcaster:Broadcaster) -> None:
+        name = container_id
+        try:
+            container = self.app.docker.containers.get(container_id)
+            name = container.name
+            stream = container.logs(stream=True, follow=True, tail=self.tail)
+            with self._lock:
+                self._streams[broadcaster] = stream
+            if broadcaster.subscriber_count == 0:
+                return
+            pending = ""
+            for chunk in stream:
+                pending += chunk.decode("utf-8", errors="replace")
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    broadcaster.publish((name, line.rstrip("\r")))
+            if pending:
+                broadcaster.publish((name, pending))
+        except Exception as e:
+            if broadcaster.subscriber_count:
+                broadcaster.publish((name, f"🖥️❌ Failed to follow logs: {e}"))
+        finally:
+            with self._lock:
+                self._streams.pop(broadcaster, None)
+                if self.followers.get(container_id) is broadcaster:
+                    del self.followers[container_id]
+            broadcaster.close()
+
+    def _idle(self, broadcaster:Broadcaster) -> None:
+        """Stops following a container nobody is watching"""
+        with self._lock:
+            if broadcaster.subscriber_count:
+                return
+            if self.followers.get(broadcaster.container_id) is broadcaster:
+                del self.followers[broadcaster.container_id]
+            stream = self._streams.pop(broadcaster, None)
+        broadcaster.close()
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                logging.error(f"Failed to close log stream for {broadcaster.container_id} - {e}")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                container_id: broadcaster.subscriber_count
+                for container_id, broadcaster in self.followers.items()
+            }
@@ -0,0 +1,235 @@
+import datetime
+import logging
+from sqlalchemy import func as sqlfunc, exists, or_
+from ..models import (
+    app,
+    db,
+    LogArchive,
+    LogChunk,
+    WorkflowTriggerRunLog,
+    ScheduleTriggerRunLog,
+    WorkflowRunLog,
+    WorkflowScheduledRunLog,
+    WorkflowTaskRunLog,
+    WorkflowTaskScheduledRunLog,
+    WorkflowScriptRunLog,
+    WorkflowScriptScheduledRunLog,
+    FINISHED_STATUSES
+)
+
+# How run logs relate to each other
+#   parent   - column that count based retention is grouped by
+#   children - (model, foreign key) pairs that must be deleted first
+#   owner    - (model, foreign key) of the log above this one in its stack,
+#              expired rows delete the top of their stack so log stacks stay complete
+RETENTION_TREE = {
+    WorkflowTriggerRunLog: dict(
+        parent="trigger_id",
+        children=[(WorkflowRunLog, "trigger_log_id")]
+    ),
+    WorkflowRunLog: dict(
+        parent="workflow_id",
+        children=[(WorkflowTaskRunLog, "workflow_log_id")],
+        owner=(WorkflowTriggerRunLog, "trigger_log_id")
+    ),
+    WorkflowTaskRunLog: dict(
+        parent="task_id",
+        children=[(WorkflowScriptRunLog, "task_log_id")],
+        owner=(WorkflowRunLog, "workflow_log_id")
+    ),
+    WorkflowScriptRunLog: dict(
+        parent="script_id",
+        children=[],
+        owner=(WorkflowTaskRunLog, "task_log_id")
+    ),
+    ScheduleTriggerRunLog: dict(
+        parent="schedule_trigger_id",
+        children=[(WorkflowScheduledRunLog, "schedule_trigger_log_id")]
+    ),
+    WorkflowScheduledRunLog: dict(
+        parent="workflow_id",
+        children=[(WorkflowTaskScheduledRunLog, "workflow_log_id")],
+        owner=(ScheduleTriggerRunLog, "schedule_trigger_log_id")
+    ),
+    WorkflowTaskScheduledRunLog: dict(
+        parent="task_id",
+        children=[(WorkflowScriptScheduledRunLog, "task_log_id")],
+        owner=(WorkflowScheduledRunLog, "workflow_log_id")
+    ),
+    WorkflowScriptScheduledRunLog: dict(
+        parent="script_id",
+        children=[],
+        owner=(WorkflowTaskScheduledRunLog, "task_log_id")
+    ),
+}
+
+
+def get_policy(model) -> dict:
+    """Combines the default retention policy with the table's overrides"""
+    config = app.config.get("RUN_LOG_RETENTION", {})
+    policy = {"max_age_days": None, "max_count": None}
+    policy.update(config.get("default", {}))
+    policy.update(config.get(model.__tablename__, {}))
+    return policy
+
+
+def finished(model):
+    """
+    Filter for logs that are done, logs still running after RUN_LOG_STALE_HOURS
+    were left behind by runs lost to a restart and count as done
+    """
+    stale = datetime.datetime.utcnow() - datetime.timedelta(
+        hours=app.config.get("RUN_LOG_STALE_HOURS", 24)
+    )
+    return or_(model.status.in_(FINISHED_STATUSES), model.timestamp < stale)
+
+
+def purgeable(model):
+    """
+    Query for ids of finished logs whose whole stack has finished,
+    logs of runs that are still going are left out so they can't stall a purge
+    """
+    query = db.session.query(model.id).filter(finished(model))
+    top = model
+    while owner := RETENTION_TREE[top].get("owner"):
+        owner_model, foreign_key = owner
+        query = query.join(owner_model, owner_model.id == getattr(top, foreign_key))
+        top = owner_model
+    if top is not model:
+        query = query.filter(finished(top))
+    return query
+
+
+def find_expired_ids(model, policy:dict, limit:int) -> list[int]:
+    """Returns up to limit ids of purgeable logs outside the retention policy"""
+    ids = []
+    if policy.get("max_age_days"):
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=policy["max_age_days"])
+        ids.extend(i for (i,) in (
+            purgeable(model)
+            .filter(model.timestamp < cutoff)
+            .order_by(model.id.asc())
+            .limit(limit)
+        ))
+    if policy.get("max_count") and len(ids) < limit:
+        parent = getattr(model, RETENTION_TREE[model]["parent"])
+        parents = (
+            db.session.query(parent)
+            .group_by(parent)
+            .having(sqlfunc.count(model.id) > policy["max_count"])
+            .all()
+        )
+        for (parent_id,) in parents:
+            if len(ids) >= limit:
+                break
+            ids.extend(i for (i,) in (
+                purgeable(model)
+                .filter(parent == parent_id)
+                .order_by(model.id.desc())
+                .offset(policy["max_count"])
+                .limit(limit - len(ids))
+            ))
+    return list(dict.fromkeys(ids))[:limit]
+
+
+def delete_logs(model, ids:list[int], batch_size:int) -> int:
+    """
+    Deletes logs and everything that depends on them
+    Children are removed first in their own bounded transactions
+    """
+    if not ids:
+        return 0
+    deleted = 0
+    for child, foreign_key in RETENTION_TREE[model]["children"]:
+        column = getattr(child, foreign_key)
+        while True:
+            child_ids = [i for (i,) in (
+                db.session.query(child.id)
+                .filter(column.in_(ids))
+                .limit(batch_size)
+            )]
+            if not child_ids:
+                break
+            deleted += delete_logs(child, child_ids, batch_size)
+    LogChunk.delete_for(model.__tablename__, ids)
+    LogArchive.delete_for(model.__tablename__, ids)
+    deleted += model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def find_stack_ids(model, ids:list[int]) -> tuple:
+    """
+    Follows owners up to the logs at the top of the given logs' stacks,
+    returns their model and the ids of those that have finished
+    """
+    while owner := RETENTION_TREE[model].get("owner"):
+        owner_model, foreign_key = owner
+        ids = [i for (i,) in (
+            db.session.query(getattr(model, foreign_key))
+            .filter(model.id.in_(ids))
+            .distinct()
+        )]
+        model = owner_model
+    ids = [i for (i,) in (
+        db.session.query(model.id)
+        .filter(model.id.in_(ids), finished(model))
+    )]
+    return model, ids
+
+
+def purge_model(model, batch_size:int, max_batches:int) -> int:
+    policy = get_policy(model)
+    if not (policy.get("max_age_days") or policy.get("max_count")):
+        return 0
+    deleted = 0
+    for _ in range(max_batches):
+        ids = find_expired_ids(model, policy, batch_size)
+        if not ids:
+            break
+        batch = delete_logs(*find_stack_ids(model, ids), batch_size)
+        if not batch:
+            break
+        deleted += batch
+    return deleted
+
+
+def purge_orphaned_storage(batch_size:int) -> int:
+    """Removes chunks / archives left behind by bulk deleted logs"""
+    deleted = 0
+    for model in RETENTION_TREE:
+        for table in (LogChunk, LogArchive):
+            ids = [i for (i,) in (
+                db.session.query(table.id)
+                .filter(
+                    table.log_type == model.__tablename__,
+                    ~exists().where(model.id == table.log_id)
+                )
+                .limit(batch_size)
+            )]
+            if ids:
+                deleted += table.query.filter(table.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+    return deleted
+
+
+def purge_run_logs(batch_size:int = None, max_batches:int = None) -> int:
+    """Enforces run log retention policies in bounded batches"""
+    batch_size = batch_size or app.config.get("RUN_LOG_PURGE_BATCH", 1000)
+    max_batches = max_batches or app.config.get("RUN_LOG_PURGE_MAX_BATCHES", 50)
+    deleted = 0
+    with app.app_context():
+        for model in RETENTION_TREE:
+            try:
+                deleted += purge_model(model, batch_size, max_batches)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Failed to purge {model.__tablename__} logs - {e}")
+        try:
+            deleted += purge_orphaned_storage(batch_size)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Failed to purge orphaned log storage - {e}")
+    if deleted:
+        logging.info(f"Purged {deleted} run log rows")
+    return deleted
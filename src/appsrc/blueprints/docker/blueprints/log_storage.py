@@ -0,0 +1,94 @@
+import logging
+from sqlalchemy import and_, exists
+from ....modules.log_compression import get_codec
+from ..models import (
+    app,
+    db,
+    LogArchive,
+    LogChunk,
+    WorkflowTriggerRunLog,
+    ScheduleTriggerRunLog,
+    WorkflowRunLog,
+    WorkflowScheduledRunLog,
+    WorkflowTaskRunLog,
+    WorkflowTaskScheduledRunLog,
+    WorkflowScriptRunLog,
+    WorkflowScriptScheduledRunLog,
+    FINISHED_STATUSES
+)
+
+RUN_LOG_MODELS = (
+    WorkflowScriptRunLog,
+    WorkflowScriptScheduledRunLog,
+    WorkflowTaskRunLog,
+    WorkflowTaskScheduledRunLog,
+    WorkflowRunLog,
+    WorkflowScheduledRunLog,
+    WorkflowTriggerRunLog,
+    ScheduleTriggerRunLog,
+)
+
+
+def get_uncompacted_logs(model, limit:int) -> list:
+    """Finds finished logs of a given type that have chunks and have not been archived yet"""
+    has_chunks = exists().where(and_(
+        LogChunk.log_type == model.__tablename__,
+        LogChunk.log_id == model.id
+    ))
+    return (
+        model.query
+        .outerjoin(LogArchive, and_(
+            LogArchive.log_type == model.__tablename__,
+            LogArchive.log_id == model.id
+        ))
+        .filter(
+            model.status.in_(FINISHED_STATUSES),
+            LogArchive.id.is_(None),
+            has_chunks
+        )
+        .order_by(model.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def compact_log(log, codec:int) -> LogArchive:
+    """Moves a log's message text and chunks into a compressed archive"""
+    archive = LogArchive.create(
+        log.__tablename__,
+        log.id,
+        log.full_message,
+        codec
+    )
+    LogChunk.delete_for(log.__tablename__, [log.id])
+    log.message = ""
+    return archive
+
+
+def compact_run_logs(batch_size:int = None) -> int:
+    """
+    Incrementally compresses finished run logs
+    At most batch_size logs are compacted per call, one commit per log type
+    """
+    batch_size = batch_size or app.config.get("RUN_LOG_COMPACTION_BATCH", 100)
+    codec = get_codec(app.config.get("RUN_LOG_COMPRESSION", "zstd"))
+    compacted = 0
+    with app.app_context():
+        for model in RUN_LOG_MODELS:
+            if compacted >= batch_size:
+                break
+            logs = get_uncompacted_logs(model, batch_size - compacted)
+            if not logs:
+                continue
+            try:
+                for log in logs:
+                    compact_log(log, codec)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Failed to compact {model.__tablename__} logs - {e}")
+                continue
+            compacted += len(logs)
+    if compacted:
+        logging.info(f"Compacted {compacted} run logs")
+    return compacted
@@ -0,0 +1,89 @@
+import logging
+import threading
+from ..models import app, db, LogChunk
+
+class RunLogWriter:
+    """
+    Buffers run log lines in memory and writes them to the db in batches.
+    Pending lines are flushed when the line / byte thresholds are crossed,
+    on a fixed interval, and when the writer is closed at the end of a run.
+    Each flush appends one LogChunk row per log instead of rewriting the
+    log's message column.
+    """
+    def __init__(
+        self,
+        max_lines:int = None,
+        max_bytes:int = None,
+        interval:float = None
+    ):
+        self.max_lines = max_lines or app.config.get("RUN_LOG_FLUSH_LINES", 200)
+        self.max_bytes = max_bytes or app.config.get("RUN_LOG_FLUSH_BYTES", 64 * 1024)
+        self.interval = interval or app.config.get("RUN_LOG_FLUSH_INTERVAL", 1.0)
+        self.logs = {}
+        self.sequences = {}
+        self.pending = {}
+        self.pending_lines = 0
+        self.pending_bytes = 0
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, msg:str, *logs) -> None:
+        """Appends a line to the buffer of each (detached) log object"""
+        line = msg + "\n"
+        logs = [l for l in logs if l is not None]
+        with self._buffer_lock:
+            for log in logs:
+                self.logs[id(log)] = log
+                self.pending.setdefault(id(log), []).append(line)
+            self.pending_lines += 1
+            self.pending_bytes += len(line) * len(logs)
+            full = (
+                self.pending_lines >= self.max_lines
+                or self.pending_bytes >= self.max_bytes
+            )
+        if full:
+            self.flush()
+
+    def flush(self, *extra) -> None:
+        """
+        Writes all pending lines in a single transaction
+        Any extra log objects are merged as well so status changes persist
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                pending, self.pending = self.pending, {}
+                self.pending_lines = self.pending_bytes = 0
+                dirty = {k: self.logs[k] for k in pending}
+            extra = [log for log in extra if log is not None]
+            if not pending and not extra:
+                return
+            with app.app_context():
+                for key, lines in pending.items():
+                    log = dirty[key]
+                    if not key in self.sequences:
+                        self.sequences[key] = LogChunk.next_sequence(
+                            log.__tablename__,
+                            log.id
+                        )
+                    log.append_chunk("".join(lines), self.sequences[key])
+                    self.sequences[key] += 1
+                for log in extra:
+                    db.session.merge(log)
+                db.session.commit()
+
+    def close(self, *extra) -> None:
+        """Stops the interval flusher and writes anything left in the buffer"""
+        self._closed.set()
+        self.flush(*extra)
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.interval):
+            if not self.pending:
+                continue
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Failed to flush run logs - {e}")
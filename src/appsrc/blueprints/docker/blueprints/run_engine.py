@@ -0,0 +1,360 @@
+import atexit
+import datetime
+import itertools
+import logging
+import queue
+import threading
+from collections import deque
+from ....modules.streams import Broadcaster, Subscription
+from ..models import app, db, load_log_stack
+from .trigger_handling import handle_trigger
+from .execution_plan import ExecutionPlan
+from .log_writer import RunLogWriter
+
+
+class RunQueueFull(Exception):
+    """Raised when a run is submitted while the run queue is at capacity"""
+
+
+class RUN_STATE_ENUM:
+    _NAMES = {
+        (QUEUED   := 0) : "QUEUED",
+        (RUNNING  := 1) : "RUNNING",
+        (FINISHED := 2) : "FINISHED",
+        (FAILED   := 3) : "FAILED",
+        (CANCELLED:= 4) : "CANCELLED",
+    }
+    _LOOKUP = {v:k for k,v in _NAMES.items()}
+
+
+class RUN_PRIORITY_ENUM:
+    _NAMES = {
+        (HIGH  := 0) : "HIGH",
+        (NORMAL:= 5) : "NORMAL",
+        (LOW   := 9) : "LOW",
+    }
+    _LOOKUP = {v:k for k,v in _NAMES.items()}
+
+
+def read_log_stack(trigger_model, trigger_log_id:int) -> list[str]:
+    """Saved lines of a run's trigger, workflow, task, and script logs, in log stack order"""
+    with app.app_context():
+        trigger_log = db.session.get(trigger_model, trigger_log_id)
+        if trigger_log is None:
+            return []
+        lines = []
+        for log in load_log_stack(trigger_log):
+            lines.append(f"🖥️📖 {log.__tablename__} {log.id}")
+            lines.extend(line for line in log.full_message.split("\n") if line)
+    return lines
+
+
+class RunOutput(Broadcaster):
+    """
+    Numbered output of a run, the last history lines are kept
+    so viewers can detach and later resume from the last event id they saw.
+    Resumes from before the buffer replay the run's saved log stack instead.
+    """
+    def __init__(self, history:int):
+        super().__init__(history=history)
+        self.sequence = 0
+        self.log = None
+        self.writer = None
+
+    def attach_log(self, trigger_log, writer:RunLogWriter) -> None:
+        """
+        Links the run's trigger log once it exists, lines are written to
+        its log stack before they're put so flushing the writer saves every earlier event
+        """
+        self.log = (type(trigger_log), trigger_log.id)
+        self.writer = writer
+
+    def put_nowait(self, message:str) -> None:
+        # Numbered and delivered under the lock so every viewer sees the same order
+        with self._lock:
+            self.sequence += 1
+            item = (self.sequence, message)
+            self.history.append(item)
+            for subscription in self.subscribers:
+                subscription.put(item)
+
+    put = put_nowait
+
+    def subscribe(self, after:int = 0, maxlen:int = 1000) -> Subscription:
+        """Subscribes to output after the given event id, replaying buffered and saved lines"""
+        with self._lock:
+            replay = bool(self.history) and after < self.history[0][0] - 1 and self.log is not None
+            saved_through = self.sequence
+        saved = []
+        if replay:
+            # Outside the lock, flushing and reading the logs hits the db
+            self.writer.flush()
+            saved = read_log_stack(*self.log)
+        # Large enough that nothing replayed is dropped
+        subscription = Subscription(maxlen + len(saved) + len(self.history) + 1, sources=1)
+        with self._lock:
+            subscription.broadcasters.append(self)
+            if saved:
+                subscription.put((None, "🖥️📖 Replaying the saved run logs"))
+                for line in saved[:-1]:
+                    subscription.put((None, line))
+                # Only the last replayed line has an id, viewers resume after the replay
+                subscription.put((saved_through, saved[-1]))
+                after = saved_through
+            elif self.history and after < self.history[0][0] - 1:
+                first = self.history[0][0]
+                subscription.put((
+                    first - 1,
+                    f"🖥️⚠️ {first - 1 - max(after, 0)} earlier lines are no longer available, see the run log"
+                ))
+            for item in self.history:
+                if item[0] > after:
+                    subscription.put(item)
+            if self.closed:
+                subscription.source_closed()
+            else:
+                self.subscribers.append(subscription)
+        return subscription
+
+
+class TriggerRun:
+    """A single queued or running handle_trigger call"""
+    def __init__(
+        self,
+        run_id:int,
+        user_id:int,
+        trigger,
+        request_headers:dict,
+        plan:ExecutionPlan,
+        output:RunOutput,
+        priority:int = RUN_PRIORITY_ENUM.NORMAL,
+        cleanup:bool = True,
+        on_complete:callable = None
+    ):
+        self.id = run_id
+        self.user_id = user_id
+        # Only ids are kept, runs are loaded again in the worker's own session
+        self.trigger_model = type(trigger)
+        self.trigger_id = trigger.id
+        self.trigger_name = trigger.name
+        self.workflow_id = plan.workflow.id
+        self.workflow_name = plan.workflow.name
+        # Plans are detached and read only, runs share them
+        self.plan = plan
+        self.request_headers = request_headers
+        self.output = output
+        self.priority = priority
+        self.cleanup = cleanup
+        self.state = RUN_STATE_ENUM.QUEUED
+        self.error = None
+        self.submitted_at = datetime.datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self.on_complete = on_complete
+
+    def load(self):
+        """Loads the trigger into the current session"""
+        trigger = db.session.get(self.trigger_model, self.trigger_id)
+        if trigger is None:
+            raise ValueError("Trigger was deleted before the run started")
+        return trigger
+
+    @property
+    def state_name(self) -> str:
+        return RUN_STATE_ENUM._NAMES[self.state]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "trigger_id": self.trigger_id,
+            "trigger": self.trigger_name,
+            "workflow_id": self.workflow_id,
+            "workflow": self.workflow_name,
+            "user_id": self.user_id,
+            "priority": RUN_PRIORITY_ENUM._NAMES.get(self.priority, self.priority),
+            "state": self.state_name,
+            "error": self.error,
+            "events": self.output.sequence,
+            "trigger_log_id": self.output.log[1] if self.output.log else None,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class RunEngine:
+    """
+    Runs triggers on a fixed pool of worker threads.
+    Runs wait in a bounded priority queue (FIFO within a priority),
+    submitting to a full queue raises RunQueueFull.
+    """
+    def __init__(self, app, workers:int = None, max_queued:int = None, history:int = None):
+        self.app = app
+        self.output_history = app.config.get("RUN_OUTPUT_HISTORY", 2000)
+        self.workers = workers or app.config.get("RUN_ENGINE_WORKERS", 4)
+        self.max_queued = max_queued or app.config.get("RUN_ENGINE_QUEUE_SIZE", 100)
+        self.queue = queue.PriorityQueue(maxsize=self.max_queued)
+        self.runs = {}
+        self.history = deque(maxlen=history or app.config.get("RUN_ENGINE_HISTORY", 50))
+        # Run ids are only unique within this process, saved runs are found through their logs
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"cetadash-run-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"Run engine started with {self.workers} workers")
+        atexit.register(self.shutdown)
+
+    def submit(
+        self,
+        user_id:int,
+        trigger,
+        request_headers:dict,
+        plan:ExecutionPlan,
+        priority:int = RUN_PRIORITY_ENUM.NORMAL,
+        cleanup:bool = True,
+        on_complete:callable = None
+    ) -> TriggerRun:
+        """
+        Queues a trigger run, raises RunQueueFull if the queue is full
+        Runs are detached from the caller, follow run.output to watch them
+        """
+        if self._stopping.is_set():
+            raise RunQueueFull("Run engine is shutting down")
+        run = TriggerRun(
+            next(self._ids),
+            user_id,
+            trigger,
+            request_headers,
+            plan,
+            RunOutput(self.output_history),
+            priority=priority,
+            cleanup=cleanup,
+            on_complete=on_complete
+        )
+        with self._lock:
+            self.runs[run.id] = run
+        try:
+            self.queue.put_nowait((priority, next(self._order), run))
+        except queue.Full:
+            with self._lock:
+                self.runs.pop(run.id, None)
+            run.output.close()
+            raise RunQueueFull(f"Run queue is full ({self.max_queued} queued runs)")
+        return run
+
+    def get(self, run_id:int) -> TriggerRun:
+        with self._lock:
+            run = self.runs.get(run_id)
+        if run is None:
+            run = next((r for r in self.history if r.id == run_id), None)
+        return run
+
+    @property
+    def queued(self) -> list[TriggerRun]:
+        with self._lock:
+            return [r for r in self.runs.values() if r.state == RUN_STATE_ENUM.QUEUED]
+
+    @property
+    def running(self) -> list[TriggerRun]:
+        with self._lock:
+            return [r for r in self.runs.values() if r.state == RUN_STATE_ENUM.RUNNING]
+
+    def active_runs(self, trigger_model, trigger_id:int) -> list[TriggerRun]:
+        """Queued and running runs of a trigger"""
+        with self._lock:
+            return [
+                r for r in self.runs.values()
+                if r.trigger_model is trigger_model and r.trigger_id == trigger_id
+            ]
+
+    def position(self, run:TriggerRun) -> int:
+        """1-based position of a queued run, 0 once it has started"""
+        if run.state != RUN_STATE_ENUM.QUEUED:
+            return 0
+        ahead = [
+            r for r in self.queued
+            if (r.priority, r.id) < (run.priority, run.id)
+        ]
+        return len(ahead) + 1
+
+    def status(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": [r.to_dict() for r in self.queued],
+            "running": [r.to_dict() for r in self.running],
+            "finished": [r.to_dict() for r in reversed(self.history)],
+        }
+
+    def shutdown(self, wait:bool = True) -> None:
+        """Stops accepting runs, cancels queued runs, and waits for running ones"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        for _ in self._threads:
+            self.queue.put((float("inf"), next(self._order), None))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _finish(self, run:TriggerRun, state:int) -> None:
+        run.state = state
+        run.finished_at = datetime.datetime.utcnow()
+        with self._lock:
+            self.runs.pop(run.id, None)
+            self.history.append(run)
+        run.output.close()
+        run.done.set()
+        if run.on_complete:
+            try:
+                run.on_complete(run)
+            except Exception as e:
+                logging.error(f"Run {run.id} completion callback failed - {e}")
+
+    def _worker(self) -> None:
+        while True:
+            _, _, run = self.queue.get()
+            try:
+                if run is None:
+                    return
+                if self._stopping.is_set():
+                    run.output.put_nowait("🖥️❌ Run cancelled, server is shutting down")
+                    run.output.put_nowait("__COMPLETE__")
+                    self._finish(run, RUN_STATE_ENUM.CANCELLED)
+                    continue
+                run.state = RUN_STATE_ENUM.RUNNING
+                run.started_at = datetime.datetime.utcnow()
+                try:
+                    # Loaded and detached in a short lived session, handle_trigger opens its own
+                    # so a run doesn't hold a connection / transaction for its whole length
+                    with self.app.app_context():
+                        trigger = run.load()
+                        db.session.expunge(trigger)
+                    handle_trigger(
+                        run.user_id,
+                        trigger,
+                        run.request_headers,
+                        run.plan,
+                        run.output,
+                        run.cleanup
+                    )
+                except Exception as e:
+                    logging.error(f"Run {run.id} of trigger {run.trigger_name} failed - {e}")
+                    run.error = str(e)
+                    run.output.put_nowait(f"🖥️❌ Run failed - {e}")
+                    run.output.put_nowait("__COMPLETE__")
+                    self._finish(run, RUN_STATE_ENUM.FAILED)
+                else:
+                    self._finish(run, RUN_STATE_ENUM.FINISHED)
+            finally:
+                self.queue.task_done()
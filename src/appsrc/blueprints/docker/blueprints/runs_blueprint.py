@@ -0,0 +1,152 @@
+import os
+from ....modules.parsing import make_table_page
+from ....modules.sse import EventStream, event_stream_view
+from flask import Blueprint, url_for, jsonify, request, render_template, abort
+from ..models import app, WorkflowTrigger
+
+blueprint = Blueprint(
+    'runs',
+    __name__,
+    static_folder=os.path.join(os.path.dirname(os.path.dirname(__file__)),"static"),
+    template_folder=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"),
+)
+
+
+def pretty_time(dt) -> str:
+    return app.wtf.pretty_date(app.wtf.localize(dt)) if dt else ""
+
+
+def trigger_link(run) -> str:
+    if run.trigger_model is WorkflowTrigger:
+        endpoint = "docker.triggers.view"
+    else:
+        endpoint = "docker.scheduler.view"
+    return app.wtf.a(
+        f"[{run.trigger_id}] {run.trigger_name}",
+        href=url_for(endpoint, trigger_id=run.trigger_id),
+        classes="link-primary"
+    )
+
+
+@blueprint.route('/')
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+def index():
+    engine = app.run_engine
+    runs = engine.running + engine.queued + list(reversed(engine.history))
+    return make_table_page(
+        "runs",
+        title = f"Trigger Runs ({len(engine.running)}/{engine.workers} running, "
+                f"{len(engine.queued)}/{engine.max_queued} queued)",
+        columns = [
+            "Run",
+            "Output",
+            "State",
+            "Trigger",
+            "Workflow",
+            "Priority",
+            "Submitted",
+            "Started",
+            "Finished",
+        ],
+        rows = [
+            (
+                run.id,
+                app.wtf.a(
+                    "View",
+                    href=url_for("docker.runs.frame", run_id=run.id),
+                    classes="link-primary"
+                ) + (
+                    " | " + app.wtf.a("Log", href=url, classes="link-primary")
+                    if (url := log_url(run)) else ""
+                ),
+                run.state_name,
+                trigger_link(run),
+                app.wtf.a(
+                    f"[{run.workflow_id}] {run.workflow_name}",
+                    href=url_for("docker.workflows.view", workflow_id=run.workflow_id),
+                    classes="link-primary"
+                ),
+                run.to_dict()["priority"],
+                pretty_time(run.submitted_at),
+                pretty_time(run.started_at),
+                pretty_time(run.finished_at),
+            )
+            for run in runs
+        ],
+    )
+
+
+@blueprint.route('/status', methods=['GET'])
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+def status():
+    return jsonify({**app.run_engine.status(), "warm_pool": app.warm_pool.status()})
+
+
+def get_run_or_404(run_id:int):
+    run = app.run_engine.get(run_id)
+    if run is None:
+        abort(404)
+    return run
+
+
+def log_url(run) -> str:
+    """Saved log stack of a run, it outlives the run and the process that ran it"""
+    if run.output.log is None:
+        return None
+    if run.trigger_model is WorkflowTrigger:
+        endpoint = "docker.triggers.logs"
+    else:
+        endpoint = "docker.scheduler.logs"
+    return url_for(endpoint, trigger_id=run.trigger_id, log_id=run.output.log[1])
+
+
+def run_urls(run) -> dict:
+    return {
+        "status_url": url_for("docker.runs.run_status", run_id=run.id),
+        "stream_url": url_for("docker.runs.stream", run_id=run.id),
+        "frame_url": url_for("docker.runs.frame", run_id=run.id),
+        "log_url": log_url(run),
+    }
+
+
+def run_event_stream(run, after:int = 0, prelude:list = ()) -> EventStream:
+    """Streams a run's output after an event id, ending once the run completes"""
+    return EventStream(
+        run.output.subscribe(after=after),
+        prelude=prelude,
+        format_item=lambda item: item[1],
+        item_id=lambda item: item[0],
+        end=lambda item: item[1] == "__COMPLETE__",
+        end_message="🖥️✅ Trigger completed.",
+        end_event=True
+    )
+
+
+@blueprint.route('/<int:run_id>', methods=['GET'])
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+def run_status(run_id):
+    run = get_run_or_404(run_id)
+    return jsonify({**run.to_dict(), **run_urls(run)})
+
+
+@blueprint.route('/<int:run_id>/stream', methods=['GET'])
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@event_stream_view
+def stream(run_id):
+    run = get_run_or_404(run_id)
+    # EventSource sends Last-Event-ID when it reconnects, last_event_id lets other clients resume
+    after = request.headers.get("Last-Event-ID", type=int)
+    if after is None:
+        after = request.args.get("last_event_id", 0, type=int)
+    return run_event_stream(run, after).response()
+
+
+@blueprint.route('/<int:run_id>/frame', methods=['GET'])
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+def frame(run_id):
+    run = get_run_or_404(run_id)
+    return render_template(
+        "pages/stream_frame.html",
+        stream_url=url_for("docker.runs.stream", run_id=run.id),
+        resumable=True
+    )
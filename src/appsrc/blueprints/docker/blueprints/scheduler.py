@@ -2,42 +2,56 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
-import queue
 import logging
 import atexit
-import threading
 from tzlocal import get_localzone
-from ..models import app, ScheduleTrigger, Workflow, WorkflowTaskAssociation, SYSTEM_ID
-from .trigger_handling import handle_trigger
+from ..models import app, db, ScheduleTrigger, SYSTEM_ID, STATUS_ENUM
+from .run_engine import RunQueueFull
+from .execution_plan import get_execution_plan, ExecutionPlanError
 
 
 def activate_trigger(trigger_id):
     with app.app_context():
-        result_queue = queue.Queue()
         trigger = ScheduleTrigger.query.get(trigger_id)
         if not trigger:
             logging.error(f"Trigger {trigger_id} not found")
             return
         
-        workflow = Workflow.query.get(trigger.workflow_id)
-        if not workflow:
+        try:
+            plan = get_execution_plan(trigger.workflow_id)
+        except ExecutionPlanError as e:
+            logging.error(f"Skipping scheduled trigger {trigger_id} - {e}")
+            trigger.log_run(status=STATUS_ENUM.FAILURE, message=f"🖥️❌ {e}")
+            db.session.commit()
+            return
+        if not plan:
             logging.error(f"Workflow {trigger.workflow_id} not found for trigger {trigger_id}")
             return
             
-        tasks = [
-            assoc.task for assoc in 
-            workflow.task_associations.order_by(
-                WorkflowTaskAssociation.priority.asc()
+        max_active = app.config.get("SCHEDULE_MAX_ACTIVE_RUNS", 3)
+        if len(app.run_engine.active_runs(ScheduleTrigger, trigger.id)) >= max_active:
+            logging.error(f"Skipping scheduled trigger {trigger_id} - {max_active} runs already active")
+            return
+        try:
+            run = app.run_engine.submit(
+                SYSTEM_ID,
+                trigger,
+                {},
+                plan,
+                on_complete=log_scheduled_run
             )
-        ]
-        thread = threading.Thread(
-            target=handle_trigger,
-            args=(SYSTEM_ID, trigger, {}, workflow, tasks, result_queue, True),
-            daemon=False
-        )
-        thread.start()
-        thread.join()
-        return
+        except RunQueueFull as e:
+            logging.error(f"Skipping scheduled trigger {trigger_id} - {e}")
+            return
+        logging.info(f"Queued run {run.id} for scheduled trigger {trigger_id}")
+
+
+def log_scheduled_run(run) -> None:
+    """Logs the outcome of a scheduled run once the run engine finishes it"""
+    if run.error:
+        logging.error(f"Scheduled run {run.id} of {run.trigger_name} {run.state_name.lower()} - {run.error}")
+    else:
+        logging.info(f"Scheduled run {run.id} of {run.trigger_name} {run.state_name.lower()}")
 
 
 class WorkflowScheduler:
@@ -3,7 +3,8 @@ import datetime
 import queue
 import threading
 from functools import wraps
-from ....modules.parsing import make_table_page
+from ....modules.parsing import make_table_page, TableColumn
+from ....modules.query_counter import query_budget
 from flask import (
     Blueprint,
     render_template,
@@ -16,6 +17,7 @@ from flask import (
     jsonify
 )
 from flask_login import current_user
+from sqlalchemy.orm import load_only, undefer
 from ..models import (
     app,
     db,
@@ -24,6 +26,7 @@ from ..models import (
     ScheduleTrigger,
     ScheduleTriggerEditLog,
     ScheduleTriggerRunLog,
+    load_log_stack,
     ACTION_ENUM,
     STATUS_ENUM
 )
@@ -42,8 +45,24 @@ blueprint = Blueprint(
 
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@query_budget(4)
 def index():
-    triggers = ScheduleTrigger.query.all()
+    # Schedule columns are all read by schedule_string
+    triggers = ScheduleTrigger.query.options(
+        load_only(
+            ScheduleTrigger.id,
+            ScheduleTrigger.name,
+            ScheduleTrigger.enabled,
+            ScheduleTrigger.edited_at,
+            ScheduleTrigger.job_type,
+            ScheduleTrigger.day_of_week,
+            ScheduleTrigger.hour,
+            ScheduleTrigger.minute,
+            ScheduleTrigger.hours,
+            ScheduleTrigger.minutes,
+            ScheduleTrigger.seconds
+        )
+    )
     new_button = app.wtf.cd.table_button(
         "New Scheduled Trigger",
         url_args=["docker.scheduler.create",{}],
@@ -53,27 +72,20 @@ def index():
     page = make_table_page(
         "schedule_triggers",
         title = "Scheduled Triggers",
+        query = triggers,
         columns = [
-            "[ID] Name",
-            # "Status",
-            "Actions",
-            # "Created",
-            # "Creator",
-            "Config",
-            "Updated",
-            # "Editor",
-        ],
-        rows = [ 
-            (
-                app.wtf.a(
+            TableColumn(
+                "[ID] Name",
+                lambda trigger: app.wtf.a(
                     f"[{trigger.id}] {trigger.name}",
                     href=url_for('docker.scheduler.view', trigger_id=trigger.id)
                 ),
-                # app.wtf.bs.badge(
-                #     ["Disabled","Enabled"][trigger.enabled],
-                #     classes="badge-pill "+["bg-danger", "bg-success"][trigger.enabled]
-                # ),
-                app.wtf.cd.table_button_row(
+                sort=ScheduleTrigger.id,
+                search=[ScheduleTrigger.id, ScheduleTrigger.name]
+            ),
+            TableColumn(
+                "Actions",
+                lambda trigger: app.wtf.cd.table_button_row(
                     app.wtf.cd.table_icon_button(
                         ('docker.scheduler.toggle_trigger',{'trigger_id':trigger.id}),
                         classes=["bi-toggle-off text-danger", "bi-toggle-on text-success"][trigger.enabled],
@@ -91,14 +103,19 @@ def index():
                         tooltip='Delete Trigger',
                     )
                 ),
-                # trigger.created_at_pretty,
-                # trigger.creator.name,
-                trigger.schedule_string,
-                trigger.edited_at_pretty,
-                
-                # trigger.last_editor.name,
-            )
-            for trigger in triggers 
+                sort=ScheduleTrigger.enabled
+            ),
+            TableColumn(
+                "Config",
+                lambda trigger: trigger.schedule_string,
+                sort=ScheduleTrigger.job_type,
+                search=ScheduleTrigger.job_type
+            ),
+            TableColumn(
+                "Updated",
+                lambda trigger: trigger.edited_at_pretty,
+                sort=ScheduleTrigger.edited_at
+            ),
         ],
         header_elements=[new_button] if current_user.is_admin else [],
     )
@@ -322,9 +339,12 @@ def edits(trigger_id, log_id):
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
 def logs(trigger_id, log_id):
     trigger = ScheduleTrigger.query.get_or_404(trigger_id) 
-    run_log = ScheduleTriggerRunLog.query.get_or_404(log_id)
+    run_log = ScheduleTriggerRunLog.query.options(
+        undefer(ScheduleTriggerRunLog.message)
+    ).get_or_404(log_id)
     if not trigger.id == run_log.schedule_trigger.id:
         raise ValueError("Trigger and edit log do not match")
+    load_log_stack(run_log)
     return render_template('pages/log_stack_page.html', log=run_log)
 
 
@@ -1,6 +1,7 @@
 import os
 import datetime
-from ....modules.parsing import make_table_page
+from ....modules.parsing import make_table_page, TableColumn
+from ....modules.query_counter import query_budget
 from flask import (
     Blueprint,
     render_template,
@@ -10,6 +11,7 @@ from flask import (
     request
 )
 from flask_login import current_user
+from sqlalchemy.orm import load_only
 from ..models import (
     app,
     db,
@@ -31,8 +33,11 @@ blueprint = Blueprint(
 
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@query_budget(4)
 def index():
-    scripts = WorkflowScript.query.all()
+    scripts = WorkflowScript.query.options(
+        load_only(WorkflowScript.id, WorkflowScript.name, WorkflowScript.edited_at)
+    )
     new_button = app.wtf.cd.table_button(
         "New Containerized Script",
         url_args=["docker.scripts.create",{}],
@@ -42,21 +47,20 @@ def index():
     page = make_table_page(
         "scripts",
         title = "Workflow Script",
+        query = scripts,
         columns = [
-            "[ID] Name",
-            "Actions",
-            # "Created",
-            # "Creator",
-            "Updated",
-            # "Editor" 
-        ],
-        rows = [
-            (
-                app.wtf.a(
+            TableColumn(
+                "[ID] Name",
+                lambda script: app.wtf.a(
                     f"[{script.id}] {script.name}",
-                    href=url_for('docker.scripts.view', script_id=script.id),                    
+                    href=url_for('docker.scripts.view', script_id=script.id)
                 ),
-                app.wtf.cd.table_button_row( 
+                sort=WorkflowScript.id,
+                search=[WorkflowScript.id, WorkflowScript.name]
+            ),
+            TableColumn(
+                "Actions",
+                lambda script: app.wtf.cd.table_button_row(
                     app.wtf.cd.table_icon_button(
                         ('docker.scripts.edit',{'script_id':script.id}),
                         classes="bi-pencil",
@@ -67,13 +71,13 @@ def index():
                         classes="bi-trash",
                         tooltip='Delete Script'
                     )
-                ),
-                # script.created_at_pretty,
-                # script.creator.name,
-                script.edited_at_pretty,
-                # script.last_editor.name
-            )
-            for script in scripts 
+                )
+            ),
+            TableColumn(
+                "Updated",
+                lambda script: script.edited_at_pretty,
+                sort=WorkflowScript.edited_at
+            ),
         ],
         header_elements=[new_button] if current_user.is_admin else [],
     )
@@ -94,6 +98,7 @@ def create():
             description=form.description.data,
             details=form.details.data,
             network_enabled=form.network_enabled.data,
+            use_warm_pool=form.use_warm_pool.data,
             dependencies=form.dependencies.data
         )
         db.session.add(script)
@@ -118,6 +123,7 @@ def edit(script_id):
         "description" : script.description,
         "details" : script.details,
         "network_enabled" : script.network_enabled,
+        "use_warm_pool" : script.use_warm_pool,
         "dependencies" : script.dependencies
     }
 
@@ -131,6 +137,7 @@ def edit(script_id):
             "description": form.description.data,
             "details": form.details.data,
             "network_enabled": form.network_enabled.data,
+            "use_warm_pool": form.use_warm_pool.data,
             "dependencies": form.dependencies.data,
         }
         for k, v in after.items():
@@ -1,6 +1,7 @@
 import os
 import datetime
-from ....modules.parsing import make_table_page
+from ....modules.parsing import make_table_page, TableColumn
+from ....modules.query_counter import query_budget
 from flask import (
     Blueprint,
     render_template,
@@ -10,6 +11,7 @@ from flask import (
     request
 )
 from flask_login import current_user
+from sqlalchemy.orm import load_only
 from ..models import (
     app,
     db,
@@ -31,8 +33,11 @@ blueprint = Blueprint(
 
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@query_budget(4)
 def index():
-    tasks = WorkflowTask.query.all()
+    tasks = WorkflowTask.query.options(
+        load_only(WorkflowTask.id, WorkflowTask.name, WorkflowTask.edited_at)
+    )
     new_button = app.wtf.cd.table_button(
         "New Workflow Task",
         url_args=["docker.tasks.create",{}],
@@ -42,21 +47,20 @@ def index():
     page = make_table_page(
         "tasks",
         title = "Workflow Tasks",
+        query = tasks,
         columns = [
-            "[ID] Name",
-            "Actions",
-            # "Created",
-            # "Creator",
-            "Updated",
-            # "Editor" 
-        ],
-        rows = [
-            (
-                app.wtf.a(
+            TableColumn(
+                "[ID] Name",
+                lambda task: app.wtf.a(
                     f"[{task.id}] {task.name}",
                     href=url_for('docker.tasks.view', task_id=task.id),                    
                 ),
-                app.wtf.cd.table_button_row( 
+                sort=WorkflowTask.id,
+                search=[WorkflowTask.id, WorkflowTask.name]
+            ),
+            TableColumn(
+                "Actions",
+                lambda task: app.wtf.cd.table_button_row( 
                     app.wtf.cd.table_icon_button(
                         ('docker.tasks.edit',{'task_id':task.id}),
                         classes="bi-pencil",
@@ -67,13 +71,13 @@ def index():
                         classes="bi-trash",
                         tooltip='Delete Task'
                     )
-                ),
-                # task.created_at_pretty,
-                # task.creator.name,
-                task.edited_at_pretty,
-                # task.last_editor.name
-            )
-            for task in tasks 
+                )
+            ),
+            TableColumn(
+                "Updated",
+                lambda task: task.edited_at_pretty,
+                sort=WorkflowTask.edited_at
+            ),
         ],
         header_elements=[new_button] if current_user.is_admin else [],
     )
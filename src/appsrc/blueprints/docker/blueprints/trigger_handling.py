@@ -1,11 +1,13 @@
 import os
 import queue
+import hashlib
 import threading
 import secrets
-import docker
 import yaml
 import shutil
 import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from jinja2 import Environment, BaseLoader
 from ..models import (
     app,
@@ -24,7 +26,18 @@ from ..models import (
     WorkflowScriptRunLog,
     WorkflowScriptScheduledRunLog,
     ACTION_ENUM,
-    STATUS_ENUM
+    STATUS_ENUM,
+    build_dependency_graph
+)
+from .log_writer import RunLogWriter
+from .compose_engine import ComposeProject
+from .image_cache import (
+    script_image_digest,
+    script_image_tag,
+    script_base_image_tag,
+    ensure_base_image,
+    lookup_script_image,
+    record_script_image
 )
 os.makedirs("/cetadash-compose", exist_ok=True)
 
@@ -46,31 +59,84 @@ def parse_environment_variables(env_string: str) -> dict:
     return env_vars
 
 
-def build_layered_environment(trigger, workflow, task):
-    """Build environment variables with proper layering (trigger/schedule > workflow > task)"""
-
-    if task.use_script:
-        layered_env = parse_environment_variables(getattr(task.script, 'environment', '') or '')
-        if task.environment and task.environment.strip():
-            task_env = parse_environment_variables(task.environment)
-            layered_env.update(task_env)
-    else:
-        layered_env = parse_environment_variables(getattr(task, 'environment', '') or '')
-    
-    if workflow.environment and workflow.environment.strip():
-        workflow_env = parse_environment_variables(workflow.environment)
-        layered_env.update(workflow_env)
-    
-    if trigger.environment and trigger.environment.strip():
-        trigger_env = parse_environment_variables(trigger.environment)
-        layered_env.update(trigger_env)
-    
+_parsed_environments = {}
+
+
+def parsed_environment(obj) -> dict:
+    """
+    Parsed environment of a script / task / workflow / trigger, cached per
+    (model, id, edited_at) so each layer is parsed once per edit, treat as read only
+    """
+    text = getattr(obj, "environment", "") or ""
+    key = (type(obj).__name__, obj.id)
+    cached = _parsed_environments.get(key)
+    # Source text is compared too, so changes that don't touch edited_at are still seen
+    if cached and cached[0] == getattr(obj, "edited_at", None) and cached[1] == text:
+        return cached[2]
+    parsed = parse_environment_variables(text)
+    _parsed_environments[key] = (getattr(obj, "edited_at", None), text, parsed)
+    return parsed
+
+
+def build_layered_environment(workflow, task):
+    """
+    Build environment variables with proper layering (workflow > task > script)
+    The trigger / schedule layer is applied on top of these per run
+    """
+    layered_env = {}
+    if task.use_script and task.script:
+        layered_env.update(parsed_environment(task.script))
+    layered_env.update(parsed_environment(task))
+    layered_env.update(parsed_environment(workflow))
     return layered_env
 
 
+# Shared by every renderer, compiled templates are cached by a hash of their source
+TEMPLATE_ENVIRONMENT = Environment(loader=BaseLoader())
+_compiled_templates = OrderedDict()
+_compiled_templates_lock = threading.Lock()
+
+
+def compile_template(template_str: str):
+    """Compiles a template once, least recently used templates are dropped past TEMPLATE_CACHE_SIZE"""
+    key = hashlib.sha256(template_str.encode("utf-8")).hexdigest()
+    with _compiled_templates_lock:
+        if (template := _compiled_templates.get(key)) is not None:
+            _compiled_templates.move_to_end(key)
+            return template
+    template = TEMPLATE_ENVIRONMENT.from_string(template_str)
+    with _compiled_templates_lock:
+        _compiled_templates[key] = template
+        while len(_compiled_templates) > app.config.get("TEMPLATE_CACHE_SIZE", 256):
+            _compiled_templates.popitem(last=False)
+    return template
+
+
+_script_templates = {}
+
+
+def read_script_template(language: str, name: str) -> str:
+    """Reads a language's script template, cached until the file's mtime changes"""
+    path = os.path.join(os.path.dirname(__file__), "script_templates", language, name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise ValueError(f"🖥️❌ Script template {name} doesn't exist for language {language}")
+    cached = _script_templates.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r") as f:
+        template = f.read()
+    _script_templates[path] = (mtime, template)
+    return template
+
+
 class TemplateRenderer:
-    def __init__(self, template_str: str, defaults: dict = None):
-        self._render = Environment(loader=BaseLoader()).from_string(template_str).render
+    def __init__(self, template, defaults: dict = None):
+        # Takes template source or an already compiled template
+        if isinstance(template, str):
+            template = compile_template(template)
+        self._render = template.render
         self.defaults = defaults or {}
 
     def render(self, **kw) -> str:
@@ -110,7 +176,57 @@ def translate_headers(request_headers:dict, headers_mapping:dict)->dict:
     return mapping
 
 
-def handle_trigger(user_id, trigger, request_headers, workflow, tasks, result_queue, cleanup=True):
+def build_task_graph(workflow, tasks:list) -> dict[int, set[int]]:
+    """
+    Maps each task id to the ids of the tasks it waits for
+    Tasks wait for every task with a lower priority unless the
+    workflow's dependencies list them explicitly
+    """
+    priorities = {
+        assoc.task_id: assoc.priority
+        for assoc in workflow.task_associations
+    }
+    return build_dependency_graph(
+        {task.id: priorities.get(task.id, 0) for task in tasks},
+        workflow.parsed_dependencies
+    )
+
+
+def run_task_graph(tasks:list, graph:dict, run_task:callable, max_parallel:int = 1) -> None:
+    """
+    Runs tasks as soon as their dependencies finish, at most max_parallel at once
+    After a failure no new tasks are started, running ones are awaited
+    and the first error is raised
+    """
+    pending = {task.id: task for task in tasks}
+    finished = set()
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            if error is None:
+                for task_id, task in list(pending.items()):
+                    if len(running) >= max_parallel:
+                        break
+                    if graph[task_id] <= finished:
+                        running[pool.submit(run_task, task)] = task
+                        del pending[task_id]
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    future.result()
+                    finished.add(task.id)
+                except Exception as e:
+                    error = error or e
+    if error:
+        raise error
+
+
+def handle_trigger(user_id, trigger, request_headers, plan, result_queue, cleanup=True):
+    workflow = plan.workflow
     session_id = get_unique_session()
     session_path = f"/cetadash-compose/{session_id}"
     os.makedirs(session_path)
@@ -137,40 +253,31 @@ def handle_trigger(user_id, trigger, request_headers, workflow, tasks, result_qu
         db.session.expunge(workflow_log)
         db.session.expunge(trigger_log)
 
+    log_writer = RunLogWriter()
+    if hasattr(result_queue, "attach_log"):
+        result_queue.attach_log(trigger_log, log_writer)
+
     def commit_logs(extra:list=[]):
-        with app.app_context():
-            db.session.merge(workflow_log)
-            db.session.merge(trigger_log)
-            for l in extra:
-                db.session.merge(l)
-            db.session.commit()
+        log_writer.flush(workflow_log, trigger_log, *extra)
+
+    def close_logs():
+        log_writer.close(workflow_log, trigger_log)
     
     def write_queue(msg):
         result_queue.put_nowait(msg.replace("\n", "\n\n"))
 
+    # Lines are logged before they're queued so resuming viewers can replay them from the logs
     def write_workflow_log(msg):
+        log_writer.write(msg, workflow_log)
         write_queue(msg)
-        with app.app_context():
-            db.session.merge(workflow_log)
-            workflow_log.message += msg + "\n"
-            db.session.commit()
 
     def write_trigger_log(msg):
+        log_writer.write(msg, trigger_log)
         write_queue(msg)
-        with app.app_context():
-            db.session.merge(trigger_log)
-            trigger_log.message += msg + "\n"
-            db.session.commit()
 
     def write_both_logs(msg):
+        log_writer.write(msg, workflow_log, trigger_log)
         write_queue(msg)
-        with app.app_context():
-            db.session.merge(workflow_log)
-            db.session.merge(trigger_log)
-            msg = msg + "\n"
-            workflow_log.message += msg
-            trigger_log.message += msg
-            db.session.commit()
 
     if isinstance(trigger, WorkflowTrigger):
         write_trigger_log("\n🖥️📖 Parsing variable map from trigger header translation")
@@ -183,7 +290,7 @@ def handle_trigger(user_id, trigger, request_headers, workflow, tasks, result_qu
             trigger_log.status = STATUS_ENUM.HEADERS
             workflow_log.status = STATUS_ENUM.HEADERS
             write_trigger_log(f"🖥️❌ Error parsing variable map - {e}")
-            commit_logs()
+            close_logs()
             raise e
         write_trigger_log("🖥️📖 Translating headers")
         try:
@@ -192,7 +299,7 @@ def handle_trigger(user_id, trigger, request_headers, workflow, tasks, result_qu
             trigger_log.status = STATUS_ENUM.HEADERS
             workflow_log.status = STATUS_ENUM.HEADERS
             write_trigger_log(f"🖥️❌ Error translating headers - {e}")
-            commit_logs()
+            close_logs()
             raise e
 
     elif isinstance(trigger, ScheduleTrigger):
@@ -206,83 +313,95 @@ def handle_trigger(user_id, trigger, request_headers, workflow, tasks, result_qu
             trigger_log.status = STATUS_ENUM.HEADERS
             workflow_log.status = STATUS_ENUM.HEADERS
             write_trigger_log(f"🖥️❌ Error parsing variable map - {e}")
-            commit_logs()
+            close_logs()
             raise e
 
-    try:
-        for task in tasks:
-            script_log = None
-            with app.app_context():
-                # Create task log
-                if isinstance(trigger, WorkflowTrigger):
-                    task_log = task.log_run(user_id, workflow_log_id=workflow_log_id)
-                elif isinstance(trigger, ScheduleTrigger):
-                    task_log = task.log_scheduled_run(workflow_log_id=workflow_log_id)
-                
-                task_log.message = ""
-                db.session.add(task_log)
+    def run_task(task):
+        script_log = None
+        with app.app_context():
+            # Create task log
+            if isinstance(trigger, WorkflowTrigger):
+                task_log = task.log_run(user_id, workflow_log_id=workflow_log_id)
+            elif isinstance(trigger, ScheduleTrigger):
+                task_log = task.log_scheduled_run(workflow_log_id=workflow_log_id)
+            
+            task_log.message = ""
+            db.session.add(task_log)
+            db.session.commit()
+
+            # Make script log if needed
+            if isinstance(trigger, WorkflowTrigger):
+                task_log = WorkflowTaskRunLog.query.get(task_log.id)
+                if task.use_script:
+                    script_log = task.script.log_run(user_id, task_log_id=task_log.id)
+            elif isinstance(trigger, ScheduleTrigger):
+                task_log = WorkflowTaskScheduledRunLog.query.get(task_log.id)
+                if task.use_script:
+                    script_log = task.script.log_scheduled_run(task_log_id=task_log.id)
+            
+            if task.use_script:
+                script_log.message = ""
+                db.session.add(script_log)
                 db.session.commit()
 
-                # Make script log if needed
-                if isinstance(trigger, WorkflowTrigger):
-                    task_log = WorkflowTaskRunLog.query.get(task_log.id)
-                    if task.use_script:
-                        script_log = task.script.log_run(user_id, task_log_id=task_log.id)
-                elif isinstance(trigger, ScheduleTrigger):
-                    task_log = WorkflowTaskScheduledRunLog.query.get(task_log.id)
-                    if task.use_script:
-                        script_log = task.script.log_scheduled_run(task_log_id=task_log.id)
-                
+            # Refresh after commit for expunge
+            if isinstance(trigger, WorkflowTrigger):
+                task_log = WorkflowTaskRunLog.query.get(task_log.id)
                 if task.use_script:
-                    script_log.message = ""
-                    db.session.add(script_log)
-                    db.session.commit()
-
-                # Refresh after commit for expunge
-                if isinstance(trigger, WorkflowTrigger):
-                    task_log = WorkflowTaskRunLog.query.get(task_log.id)
-                    if task.use_script:
-                        script_log = WorkflowScriptRunLog.query.get(script_log.id)
-                elif isinstance(trigger, ScheduleTrigger):
-                    task_log = WorkflowTaskScheduledRunLog.query.get(task_log.id)
-                    if task.use_script:
-                        script_log = WorkflowScriptScheduledRunLog.query.get(script_log.id)
-
-                db.session.expunge(task_log)
+                    script_log = WorkflowScriptRunLog.query.get(script_log.id)
+            elif isinstance(trigger, ScheduleTrigger):
+                task_log = WorkflowTaskScheduledRunLog.query.get(task_log.id)
                 if task.use_script:
-                    db.session.expunge(script_log)
+                    script_log = WorkflowScriptScheduledRunLog.query.get(script_log.id)
+
+            db.session.expunge(task_log)
+            if task.use_script:
+                db.session.expunge(script_log)
+
+        write_queue("\n"*2)
+        write_workflow_log("="*40)
+        write_workflow_log(f"🖥️✅ Handling task [{task.id}] {task.name} - {session_id}")
+        
+        success = True
+        message = ""
+        try:
+            handle_task(
+                trigger,
+                trigger_variables,
+                plan,
+                task,
+                session_id,
+                result_queue,
+                task_log,
+                log_writer,
+                script_log=script_log,
+                cleanup=cleanup
+            )
+            task_log.status = STATUS_ENUM.SUCCESS
+        except Exception as e:
+            import traceback
+            print(traceback.print_exc())
+            task_log.status = STATUS_ENUM.FAILURE
+            success = False
+            message = e
+        finally:
+            # Script logs share the task status so they can be compacted
+            if script_log:
+                script_log.status = task_log.status
+            commit_logs([task_log, script_log])
+        if not success:
+            raise ValueError(f"Task failed - {message}")
+        write_workflow_log(f"🖥️✅ Finished task {task} - {session_id}")
+
+    try:
+        max_parallel = min(
+            max(workflow.max_parallel or 1, 1),
+            app.config.get("WORKFLOW_MAX_PARALLEL", 8)
+        )
+        if max_parallel > 1:
+            write_workflow_log(f"🖥️🔀 Running up to {max_parallel} tasks in parallel")
+        run_task_graph(plan.tasks, plan.graph, run_task, max_parallel)
 
-            write_queue("\n"*2)
-            write_workflow_log("="*40)
-            write_workflow_log(f"🖥️✅ Handling task [{task.id}] {task.name} - {session_id}")
-            
-            success = True
-            message = ""
-            try:
-                handle_task(
-                    trigger,
-                    trigger_variables,
-                    workflow,
-                    task,
-                    session_id,
-                    result_queue,
-                    task_log,
-                    script_log=script_log,
-                    cleanup=cleanup
-                )
-                task_log.status = STATUS_ENUM.SUCCESS
-            except Exception as e:
-                import traceback
-                print(traceback.print_exc())
-                task_log.status = STATUS_ENUM.FAILURE
-                success = False
-                message = e
-            finally:
-                commit_logs([task_log])
-            if not success:
-                raise ValueError(f"Task failed - {message}")
-            write_workflow_log(f"🖥️✅ Finished task {task} - {session_id}")
-            
     except Exception as e:
         trigger_log.status = STATUS_ENUM.TASK
         write_both_logs(f"🖥️❌ Error during workflow task handling - {e}")
@@ -303,25 +422,23 @@ def handle_trigger(user_id, trigger, request_headers, workflow, tasks, result_qu
     write_workflow_log(f"🖥️✅ Workflow {workflow.name} - session {session_id} completed")
     write_queue("\n"*2)
     write_queue("__COMPLETE__")
-    commit_logs()
+    close_logs()
 
 
-def up_compose(session, path, result_queue, task_log, cleanup=True):
-    def write_log(msg):
-        with app.app_context():
-            db.session.merge(task_log)
-            task_log.message += msg+"\n"
-            db.session.commit()
-        result_queue.put_nowait(msg)
-
+def start_compose(path, write_log, project:str = None):
+    """
+    Runs docker compose up -d for a compose file and returns its containers
+    The default, ComposeProject is used instead when COMPOSE_ENGINE is "sdk"
+    """
     def queue_std(pipe, tag):
         for line in iter(pipe.readline, ''):
             msg = tag + line.strip()
             write_log(msg)
         pipe.close()
     # Start container
+    # Named after the compose file's directory unless a project name is given
     process = subprocess.Popen(
-        ["docker", "compose", "-f", path, "up", "-d"],
+        ["docker", "compose", *(["-p", project] if project else []), "-f", path, "up", "-d"],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
@@ -338,147 +455,253 @@ def up_compose(session, path, result_queue, task_log, cleanup=True):
     with open(path, 'r') as f:
         conf = yaml.safe_load(f)
 
-    client = docker.from_env()
     container_names = [k for k,v in conf["services"].items()]
     write_log(f"🖥️🔗 Fetching containers {container_names}")
-    containers = [client.containers.get(c) for c in container_names]
-    def queue_container(cont):
-        try:
-            write_log(f"🖥️⛓️ Attaching to logs for {cont.name}.")
-            for log in cont.logs(stream=True, follow=True, tail=1000):
-                write_log((f"🐳🧾 [{cont.name}]: " + log.decode('utf-8')).strip())
-        except Exception as e:
-            write_log(f"🖥️❌ Failed to attach to logs for {cont.name}: {e}")
+    return [app.docker.containers.get(c) for c in container_names]
+
 
+def follow_container_logs(container, write_log) -> None:
+    """Writes every line a container logs until it exits"""
+    try:
+        pending = ""
+        for chunk in container.logs(
+            stream=True,
+            follow=True,
+            tail=app.config.get("RUN_LOG_TAIL", 1000)
+        ):
+            pending += chunk.decode("utf-8", errors="replace")
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                write_log(f"🐳🧾 [{container.name}]: {line}".strip())
+        if pending:
+            write_log(f"🐳🧾 [{container.name}]: {pending}".strip())
+    except Exception as e:
+        write_log(f"🖥️❌ Failed to attach to logs for {container.name}: {e}")
+
+
+def attach_compose(containers, write_log, cleanup=True):
+    """
+    Follows container logs until they exit, then removes them
+    Run logs are saved in full, so containers are followed directly
+    instead of through the log multiplexer, whose slow viewers drop lines
+    """
     threads = []
     for c in containers:
-        threads.append(threading.Thread(
-            target=queue_container,
-            args=(c, )
-        ))
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
+        write_log(f"🖥️⛓️ Attaching to logs for {c.name}.")
+        thread = threading.Thread(
+            target=follow_container_logs,
+            args=(c, write_log),
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
     write_log(f"🖥️✅ Compose run completed.")
     if cleanup:
         write_log(f"🖥️🧹 Cleaning up containers...")
         for c in containers:
             write_log(f"🐳🗑️ Removing container {c.name}")
             c.remove(force=True)
-    
+
+
+def up_compose(session, path, result_queue, task_log, log_writer, cleanup=True):
+    def write_log(msg):
+        log_writer.write(msg, task_log)
+        result_queue.put_nowait(msg)
+
+    containers = start_compose(path, write_log)
+    attach_compose(containers, write_log, cleanup=cleanup)
+
+def run_warm_script(script, variables_map:dict, layered_env:dict, write_log:callable) -> None:
+    """Runs a script in a pre-started container from its dependency image"""
+    base_template = read_script_template(script.language, "base.dockerfile.template")
+    base_digest = script_image_digest(
+        script.language,
+        base_template,
+        script.dependencies,
+        ""
+    )
+    base_image = ensure_base_image(
+        base_digest,
+        script.language,
+        base_template,
+        script.dependencies,
+        write_log
+    )
+    environment = {
+        **layered_env,
+        "SESSION_ID": variables_map["session_id"],
+        "TASK_ID": str(variables_map["task_id"]),
+        "PYTHONUNBUFFERED": "1"
+    }
+    exit_code = app.warm_pool.run(
+        base_image,
+        script.network_enabled,
+        script.id,
+        script.script,
+        environment,
+        write_log
+    )
+    if exit_code:
+        raise ValueError(f"Script exited with code {exit_code}")
+
+
 def handle_task(
     trigger,
     trigger_variables,
-    workflow,
+    plan,
     task,
     session,
     result_queue,
     task_log,
+    log_writer,
     script_log=None,
     cleanup=True
 ):
 
     def write_log(msg):
-        with app.app_context():
-            db.session.merge(task_log)
-            task_log.message += msg+"\n"
-            if script_log:
-                db.session.merge(script_log)
-                script_log.message += msg+"\n"
-            db.session.commit()
+        log_writer.write(msg, task_log, script_log)
         result_queue.put_nowait(msg)
 
     variables_map = trigger_variables.copy()
-    variables_map.update({"session_id": session})
+    variables_map.update({"session_id": session, "task_id": task.id})
     write_log("🖥️🌐 Building layered environment (trigger > workflow > task)")
 
-    layered_env = build_layered_environment(trigger, workflow, task)
+    # Script, task, and workflow layers are merged once per plan
+    layered_env = {**plan.environments[task.id], **parsed_environment(trigger)}
     layered_env_string = format_environment_string(layered_env)
     write_log(f"🖥️📊 Environment layers applied: {len(layered_env)} variables total")
     if layered_env:
         write_log(f"🖥️🔧 Environment variables: {', '.join(layered_env.keys())}")
 
+    if task.use_script and task.script.use_warm_pool:
+        write_log("🖥️♨️ Running script in warm container pool")
+        run_warm_script(task.script, variables_map, layered_env, write_log)
+        return
+
+    # Each task gets its own directory so tasks running in parallel don't share files
+    task_path = f"/cetadash-compose/{session}/{task.id}"
+    os.makedirs(task_path, exist_ok=True)
+
     if task.use_script:
         write_log("🖥️✏️ Rendering Task Script Template")
-        
+    
         # Get script from task (assuming task has a script attribute)
         script = task.script
-        template_dir = os.path.join(os.path.dirname(__file__), "script_templates", script.language)
-        if not os.path.exists(template_dir):
-            raise ValueError(f"🖥️❌ Script template directory doesn't exist for language {script.language}")
-        
-        dockerfile_template_path = os.path.join(template_dir, "dockerfile.template")
-        with open(dockerfile_template_path, "r") as f:
-            dockerfile_template = f.read()
-        compose_template_path = os.path.join(template_dir, "compose.template")
-        with open(compose_template_path, "r") as f:
-            compose_template = f.read()
+        dockerfile_template = read_script_template(script.language, "dockerfile.template")
+        compose_template = read_script_template(script.language, "compose.template")
+        base_template = read_script_template(script.language, "base.dockerfile.template")
+    
+        # Images are keyed by their contents, a cache hit skips the build
+        # Dependencies live in a shared base image, scripts only add a thin layer
+        base_digest = script_image_digest(
+            script.language,
+            base_template,
+            script.dependencies,
+            ""
+        )
+        digest = script_image_digest(
+            script.language,
+            dockerfile_template,
+            base_digest,
+            script.script
+        )
+        base_tag = script_base_image_tag(base_digest)
+        cached = lookup_script_image(digest, base_tag=base_tag)
+        variables_map.update({
+            "image_tag": script_image_tag(digest),
+            "base_image": base_tag,
+            "build_image": not cached
+        })
+        if cached:
+            write_log(f"🖥️📦 Using cached script image {digest[:12]}")
+        else:
+            write_log(f"🖥️📦 No cached script image, building {digest[:12]}")
+            ensure_base_image(
+                base_digest,
+                script.language,
+                base_template,
+                script.dependencies,
+                write_log
+            )
+            try:
+                write_log("🖥️✏️ Rendering Script dockerfile")
+                dockerfile_renderer = TemplateRenderer(dockerfile_template, variables_map)
+                rendered_dockerfile = dockerfile_renderer.render() 
         
-        try:
-            write_log("🖥️✏️ Rendering Script dockerfile")
-            dockerfile_renderer = TemplateRenderer(dockerfile_template, variables_map)
-            rendered_dockerfile = dockerfile_renderer.render() 
+                # Write dockerfile to the task directory
+                dockerfile_location = f"{task_path}/Dockerfile"
+                write_log("🖥️💾 Writing Script dockerfile...")
+                with open(dockerfile_location, "w+") as f:
+                    f.write(rendered_dockerfile)
             
-            # Write dockerfile to session directory
-            dockerfile_location = f"/cetadash-compose/{session}/Dockerfile"
-            os.makedirs(os.path.dirname(dockerfile_location), exist_ok=True)
-            write_log("🖥️💾 Writing Script dockerfile...")
-            with open(dockerfile_location, "w+") as f:
-                f.write(rendered_dockerfile)
-                
-        except Exception as e:
-            write_log(f"🖥️❌ Error rendering dockerfile template {dockerfile_template_path} - {e}")
-            raise
+            except Exception as e:
+                write_log(f"🖥️❌ Error rendering dockerfile template for {script.language} - {e}")
+                raise
+
+            write_log("🖥️✏️ Writing Script to file")
+            main_location = f"{task_path}/main.py"
+            with open(main_location, "w+") as f:
+                f.write(script.script)
 
         write_log("🖥️✏️ Rendering Script compose template")
         renderer = TemplateRenderer(compose_template, variables_map)
         rendered_template = renderer.render()
 
-        write_log("🖥️✏️ Writing Script to file")
-        main_location = f"/cetadash-compose/{session}/main.py"
-        with open(main_location, "w+") as f:
-            f.write(script.script)
-
-        if script.dependencies.strip():
-            write_log("🖥️✏️ Writing Dependencies to file")
-            requirements_location = f"/cetadash-compose/{session}/requirements.txt"
-            with open(requirements_location, "w+") as f:
-                f.write(script.dependencies)
-        else:
-            write_log("🖥️✏️ No Dependencies to write")
-
     else:
         write_log("🖥️✏️ Rendering Task template")
-        renderer = TemplateRenderer(task.template, variables_map)
+        renderer = TemplateRenderer(plan.templates[task.id], variables_map)
         rendered_template = renderer.render()  
 
     try:
         write_log("🖥️📖 Loading compose file from task template")
         loaded_compose = yaml.safe_load(rendered_template)
-        
+    
     except Exception as e:
         write_log(f"🖥️❌ Error loading template {rendered_template} - {e}")
         raise
-    
-    # Ensure directory exists
-    compose_location = f"/cetadash-compose/{session}/{task.id}.yml"
-    os.makedirs(os.path.dirname(compose_location), exist_ok=True)
-    
+
+    compose_location = f"{task_path}/{task.id}.yml"
+
     write_log("🖥️💾 Writing compose file...")
     with open(compose_location, "w+") as f:
         yaml.dump(loaded_compose, f, default_flow_style=False, sort_keys=False)
-    
+
     write_log("🖥️💾 Writing layered env file...")
-    env_location = f"/cetadash-compose/{session}/.env"
+    env_location = f"{task_path}/.env"
     with open(env_location, "w+") as f:
         f.write(layered_env_string)
-    
+
     write_log("🖥️⬆️ Starting containers from compose file...")
-    up_compose(
-        session,
-        compose_location,
-        result_queue,
-        task_log,
-        cleanup=cleanup
-    )
\ No newline at end of file
+    if app.config.get("COMPOSE_ENGINE", "cli") == "sdk":
+        project = ComposeProject(
+            f"cetadash-{session}-{task.id}",
+            loaded_compose,
+            task_path,
+            write_log
+        )
+        try:
+            project.up()
+        except Exception:
+            if cleanup:
+                project.down()
+            raise
+    else:
+        project = None
+        containers = start_compose(compose_location, write_log, f"cetadash-{session}-{task.id}")
+    if task.use_script and not cached:
+        # The containers are already up, a cache bookkeeping error must not strand them
+        try:
+            record_script_image(digest, script.language, base_tag=base_tag)
+        except Exception as e:
+            write_log(f"🖥️⚠️ Failed to record script image {digest[:12]} - {e}")
+    if project is None:
+        attach_compose(containers, write_log, cleanup=cleanup)
+        return
+    project.wait()
+    write_log(f"🖥️✅ Compose run completed.")
+    if cleanup:
+        write_log(f"🖥️🧹 Cleaning up containers...")
+        project.down()
+    write_log(f"🖥️⏱️ Timings: {project.summary()}")
\ No newline at end of file
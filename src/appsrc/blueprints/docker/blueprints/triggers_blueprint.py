@@ -1,8 +1,9 @@
 import os
+import logging
 import datetime
-import queue
 import threading
-from ....modules.parsing import make_table_page
+from ....modules.parsing import make_table_page, TableColumn
+from ....modules.query_counter import query_budget
 from flask import (
     Blueprint,
     render_template,
@@ -11,22 +12,28 @@ from flask import (
     flash,
     request,
     Response,
-    stream_with_context
+    jsonify,
+    abort
 )
 from flask_login import current_user
+from werkzeug.datastructures import Headers
+from sqlalchemy.orm import load_only, undefer
 from ..models import (
     app,
     db,
     Workflow,
     WorkflowTrigger,
-    WorkflowTaskAssociation,
     WorkflowTriggerEditLog,
     WorkflowTriggerRunLog,
+    load_log_stack,
     ACTION_ENUM,
     STATUS_ENUM
 )
 from ..forms import TriggerForm
-from .trigger_handling import handle_trigger
+from .run_engine import RunQueueFull, TriggerRun
+from .execution_plan import get_execution_plan, ExecutionPlanError
+from .runs_blueprint import run_urls, run_event_stream
+from ....modules.sse import event_stream_view
 
 blueprint = Blueprint(
     'triggers',
@@ -38,8 +45,18 @@ blueprint = Blueprint(
 
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@query_budget(4)
 def index():
-    triggers = WorkflowTrigger.query.all()
+    triggers = WorkflowTrigger.query.options(
+        load_only(
+            WorkflowTrigger.id,
+            WorkflowTrigger.name,
+            WorkflowTrigger.endpoint,
+            WorkflowTrigger.enabled,
+            WorkflowTrigger.created_at,
+            WorkflowTrigger.edited_at
+        )
+    )
     new_button = app.wtf.cd.table_button(
         "New Trigger",
         url_args=["docker.triggers.create",{}],
@@ -49,28 +66,21 @@ def index():
     page = make_table_page(
         "triggers",
         title = "Workflow Triggers",
+        query = triggers,
         columns = [
-            "Name",
-            # "Status",
-            "Actions",
-            "Endpoint",
-            "Created",
-            # "Creator",
-            "Updated",
-            # "Editor" 
-        ],
-        rows = [
-            (
-                app.wtf.a(
+            TableColumn(
+                "Name",
+                lambda trigger: app.wtf.a(
                     f"[{trigger.id}] {trigger.name}",
                     href=url_for('docker.triggers.view', trigger_id=trigger.id),
                     classes="link-primary"
                 ),
-                # app.wtf.bs.badge(
-                #     ["Disabled","Enabled"][trigger.enabled],
-                #     classes="badge-pill "+["bg-danger", "bg-success"][trigger.enabled]
-                # ),
-                app.wtf.cd.table_button_row(
+                sort=WorkflowTrigger.id,
+                search=[WorkflowTrigger.id, WorkflowTrigger.name]
+            ),
+            TableColumn(
+                "Actions",
+                lambda trigger: app.wtf.cd.table_button_row(
                     app.wtf.cd.table_icon_button(
                         ('docker.triggers.toggle_trigger',{'trigger_id':trigger.id}),
                         classes=["bi-toggle-off text-danger", "bi-toggle-on text-success"][trigger.enabled],
@@ -99,17 +109,28 @@ def index():
                         float=None
                     )
                 ),
-                app.wtf.a(
+                sort=WorkflowTrigger.enabled
+            ),
+            TableColumn(
+                "Endpoint",
+                lambda trigger: app.wtf.a(
                     trigger.endpoint,
                     href=url_for('docker.triggers.activate', trigger_id=trigger.id),
                     classes="link-secondary"
                 ),
-                trigger.created_at_pretty,
-                # trigger.creator.name,
-                trigger.edited_at_pretty,
-                # trigger.last_editor.name,
-            )
-            for trigger in triggers 
+                sort=WorkflowTrigger.endpoint,
+                search=WorkflowTrigger.endpoint
+            ),
+            TableColumn(
+                "Created",
+                lambda trigger: trigger.created_at_pretty,
+                sort=WorkflowTrigger.created_at
+            ),
+            TableColumn(
+                "Updated",
+                lambda trigger: trigger.edited_at_pretty,
+                sort=WorkflowTrigger.edited_at
+            ),
         ],
         header_elements=[new_button] if current_user.is_admin else [],
     )
@@ -233,9 +254,12 @@ def edits(trigger_id, log_id):
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
 def logs(trigger_id, log_id):
     trigger = WorkflowTrigger.query.get_or_404(trigger_id) 
-    run_log = WorkflowTriggerRunLog.query.get_or_404(log_id)
+    run_log = WorkflowTriggerRunLog.query.options(
+        undefer(WorkflowTriggerRunLog.message)
+    ).get_or_404(log_id)
     if not trigger.id == run_log.trigger.id:
         raise ValueError("Trigger and edit log do not match")
+    load_log_stack(run_log)
     return render_template('pages/log_stack_page.html', log=run_log)
 
 
@@ -249,53 +273,81 @@ def delete(trigger_id):
     return redirect(url_for('docker.triggers.index'))
 
 
-@blueprint.route('/trigger/<trigger_id>/activate', methods=['GET','POST'])
-@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
-def activate(trigger_id):
-    request_headers = request.headers
-    result_queue = queue.Queue()
+def submit_trigger_run(trigger_id):
+    """Queues a run of a trigger, returns the run or an error response"""
+    request_headers = Headers(request.headers)
     trigger = WorkflowTrigger.query.get_or_404(trigger_id)
     if not trigger.enabled:
         flash("Trigger is not enabled.", 'danger')
         return redirect(url_for("docker.triggers.index"))
-    workflow = Workflow.query.get_or_404(trigger.workflow_id)
-    tasks = [
-        assoc.task for assoc in 
-        workflow.task_associations.order_by(
-            WorkflowTaskAssociation.priority.asc()
+    try:
+        plan = get_execution_plan(trigger.workflow_id)
+    except ExecutionPlanError as e:
+        logging.error(f"Failed to plan trigger {trigger.id} - {e}")
+        run_log = trigger.log_run(
+            current_user.id,
+            status=STATUS_ENUM.FAILURE,
+            message=f"🖥️❌ {e}"
         )
-    ]
+        db.session.commit()
+        flash(f"Trigger could not be run - {e}", 'danger')
+        return redirect(url_for("docker.triggers.logs", trigger_id=trigger.id, log_id=run_log.id))
+    if plan is None:
+        abort(404)
     
-    threading.Thread(
-        target=handle_trigger,
-        args=(current_user.id, trigger, request_headers, workflow, tasks, result_queue, True),
-        daemon=False
-    ).start()
+    try:
+        return app.run_engine.submit(
+            current_user.id,
+            trigger,
+            request_headers,
+            plan
+        )
+    except RunQueueFull as e:
+        return Response(
+            f"🖥️❌ {e}, try again later",
+            status=429,
+            headers={"Retry-After": str(app.config.get("RUN_ENGINE_RETRY_AFTER", 10))}
+        )
 
-    @stream_with_context
-    def generate():
-        yield f"data: 🖥️▶️ Running trigger {trigger.name} ({trigger.id})\n\n"
-        while True:
-            try:
-                line = result_queue.get(timeout=0.5)
-                if line == "__COMPLETE__":
-                    result_queue.task_done()
-                    yield "data: 🖥️✅ Trigger completed.\n\n"
-                    break
-                yield "data: " + line + "\n\n"
-                result_queue.task_done()
-            except queue.Empty:
-                continue
-            except GeneratorExit:
-                break
 
-    return Response(generate(), mimetype='text/event-stream')
+@blueprint.route('/trigger/<trigger_id>/activate', methods=['GET','POST'])
+@app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@event_stream_view
+def activate(trigger_id):
+    """
+    Starts a run and streams its output,
+    clients that send Prefer: respond-async or ?detach=1 get its id with a 202 instead
+    """
+    run = submit_trigger_run(trigger_id)
+    if not isinstance(run, TriggerRun):
+        return run
+    detach = (
+        "respond-async" in request.headers.get("Prefer", "")
+        or request.args.get("detach", "").lower() in ("1", "true", "yes")
+    )
+    if detach:
+        urls = run_urls(run)
+        return jsonify({**run.to_dict(), **urls}), 202, {"Location": urls["status_url"]}
+
+    prelude = []
+    if position := app.run_engine.position(run):
+        prelude.append(f"🖥️⏳ Run {run.id} queued at position {position}")
+    prelude.append(f"🖥️▶️ Running trigger {run.trigger_name} ({run.trigger_id}) as run {run.id}")
+    return run_event_stream(run, prelude=prelude).response()
 
 
 @blueprint.route('/trigger/<trigger_id>/actionframe', methods=['GET', 'POST'])
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
 def actionframe(trigger_id):
-    return render_template("pages/stream_frame.html", stream_url=url_for("docker.triggers.activate", trigger_id=trigger_id))
+    run = submit_trigger_run(trigger_id)
+    if not isinstance(run, TriggerRun):
+        return run
+    # The frame follows the detached run, so it can reconnect without starting another
+    return render_template(
+        "pages/stream_frame.html",
+        stream_url=url_for("docker.runs.stream", run_id=run.id),
+        resumable=True
+    )
 
 
 @blueprint.route('/trigger/<trigger_id>/toggle', methods=['POST'])
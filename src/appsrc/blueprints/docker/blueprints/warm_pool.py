@@ -0,0 +1,241 @@
+import io
+import atexit
+import logging
+import secrets
+import tarfile
+import threading
+import time
+from collections import deque
+import docker
+
+POOL_LABEL = "cetadash.warm-pool"
+
+
+class WarmContainer:
+    """An idle container kept running so scripts can be exec'd into it"""
+    def __init__(self, container, key:tuple):
+        self.container = container
+        self.key = key
+        self.uses = 0
+        self.idle_since = time.monotonic()
+
+    @property
+    def name(self) -> str:
+        return self.container.name
+
+
+def make_script_archive(directory:str, script:str) -> bytes:
+    """Tars a directory holding main.py for put_archive"""
+    data = (script or "").encode("utf-8")
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        folder = tarfile.TarInfo(directory)
+        folder.type = tarfile.DIRTYPE
+        folder.mode = 0o755
+        folder.mtime = int(time.time())
+        tar.addfile(folder)
+        main = tarfile.TarInfo(f"{directory}/main.py")
+        main.size = len(data)
+        main.mode = 0o644
+        main.mtime = folder.mtime
+        tar.addfile(main, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class WarmContainerPool:
+    """
+    Keeps pre-started idle containers per dependency image, network mode, and script.
+    Containers are only reused by the script they first ran, so nothing a script
+    leaves behind in a container is seen by another script.
+    Scripts are copied in with put_archive and run with exec,
+    containers are removed once idle for idle_ttl seconds or used max_reuse times.
+    """
+    def __init__(self, app, size:int = None, idle_ttl:int = None, max_reuse:int = None):
+        self.app = app
+        self.size = size or app.config.get("WARM_POOL_SIZE", 2)
+        self.idle_ttl = idle_ttl or app.config.get("WARM_POOL_IDLE_TTL", 300)
+        self.max_reuse = max_reuse or app.config.get("WARM_POOL_MAX_REUSE", 50)
+        self.idle = {}
+        self._starting = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        threading.Thread(target=self.remove_stale, daemon=True).start()
+        atexit.register(self.shutdown)
+
+    @property
+    def client(self):
+        return self.app.docker
+
+    def _start(self, key:tuple) -> WarmContainer:
+        image, network_enabled, _ = key
+        container = self.client.containers.run(
+            image,
+            entrypoint=["tail", "-f", "/dev/null"],
+            name=f"cetadash-warm-{secrets.token_hex(6)}",
+            labels={POOL_LABEL: image},
+            network_mode="bridge" if network_enabled else "none",
+            working_dir="/cetadash-script",
+            detach=True
+        )
+        return WarmContainer(container, key)
+
+    def _remove(self, warm:WarmContainer) -> None:
+        try:
+            warm.container.remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            logging.error(f"Failed to remove warm container {warm.name} - {e}")
+
+    def _expired(self, warm:WarmContainer) -> bool:
+        return time.monotonic() - warm.idle_since > self.idle_ttl
+
+    def _fill(self, key:tuple) -> None:
+        """Starts containers until the key has size idle containers"""
+        while not self._stopping.is_set():
+            with self._lock:
+                idle = self.idle.setdefault(key, deque())
+                if len(idle) + self._starting.get(key, 0) >= self.size:
+                    return
+                self._starting[key] = self._starting.get(key, 0) + 1
+            try:
+                warm = self._start(key)
+            except Exception as e:
+                logging.error(f"Failed to start warm container for {key[0]} - {e}")
+                return
+            finally:
+                with self._lock:
+                    self._starting[key] -= 1
+            with self._lock:
+                self.idle[key].append(warm)
+
+    def acquire(self, image:str, network_enabled:bool, script_id:int) -> WarmContainer:
+        """Takes an idle container or starts a new one, then tops the pool back up"""
+        key = (image, bool(network_enabled), script_id)
+        warm = None
+        expired = []
+        with self._lock:
+            idle = self.idle.setdefault(key, deque())
+            while idle:
+                candidate = idle.pop()
+                if self._expired(candidate):
+                    expired.append(candidate)
+                    continue
+                warm = candidate
+                break
+        for candidate in expired:
+            self._remove(candidate)
+        if warm is not None:
+            try:
+                warm.container.reload()
+                if warm.container.status != "running":
+                    raise ValueError(warm.container.status)
+            except Exception:
+                self._remove(warm)
+                warm = None
+        if warm is None:
+            warm = self._start(key)
+        threading.Thread(target=self._fill, args=(key,), daemon=True).start()
+        return warm
+
+    def release(self, warm:WarmContainer, healthy:bool = True) -> None:
+        """Returns a container to the pool, or removes it if it is spent"""
+        warm.uses += 1
+        warm.idle_since = time.monotonic()
+        with self._lock:
+            idle = self.idle.setdefault(warm.key, deque())
+            keep = (
+                healthy
+                and not self._stopping.is_set()
+                and warm.uses < self.max_reuse
+                and len(idle) < self.size
+            )
+            if keep:
+                idle.append(warm)
+        if not keep:
+            self._remove(warm)
+
+    def run(
+        self,
+        image:str,
+        network_enabled:bool,
+        script_id:int,
+        script:str,
+        environment:dict,
+        write_log:callable
+    ) -> int:
+        """Runs a script in a warm container, streaming output to write_log, returns the exit code"""
+        started = time.monotonic()
+        warm = self.acquire(image, network_enabled, script_id)
+        write_log(f"🖥️♨️ Using warm container {warm.name} ({time.monotonic() - started:.2f}s)")
+        directory = f"cetadash-{secrets.token_hex(8)}"
+        workdir = f"/tmp/{directory}"
+        healthy = False
+        try:
+            warm.container.put_archive("/tmp", make_script_archive(directory, script))
+            exec_id = self.client.api.exec_create(
+                warm.container.id,
+                ["python3", "-u", "main.py"],
+                environment=environment,
+                workdir=workdir,
+                user="cetauser"
+            )["Id"]
+            stream = self.client.api.exec_start(exec_id, stream=True)
+            # exec streams keep the client's read timeout, quiet scripts would fail their task
+            self.client.api._disable_socket_timeout(
+                self.client.api._get_raw_response_socket(stream._response)
+            )
+            pending = ""
+            for chunk in stream:
+                pending += chunk.decode("utf-8", errors="replace")
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    write_log(f"🐳🧾 [{warm.name}]: {line}".strip())
+            if pending:
+                write_log(f"🐳🧾 [{warm.name}]: {pending}".strip())
+            exit_code = self.client.api.exec_inspect(exec_id)["ExitCode"]
+            warm.container.exec_run(["rm", "-rf", workdir], user="root")
+            healthy = True
+        finally:
+            self.release(warm, healthy)
+        write_log(f"🖥️✅ Warm run completed with exit code {exit_code} ({time.monotonic() - started:.2f}s)")
+        return exit_code
+
+    def prune(self) -> int:
+        """Removes idle containers past their ttl"""
+        expired = []
+        with self._lock:
+            for key, idle in self.idle.items():
+                keep = deque(w for w in idle if not self._expired(w))
+                expired.extend(w for w in idle if self._expired(w))
+                self.idle[key] = keep
+        for warm in expired:
+            self._remove(warm)
+        if expired:
+            logging.info(f"Pruned {len(expired)} idle warm containers")
+        return len(expired)
+
+    def remove_stale(self) -> None:
+        """Removes pool containers left behind by a previous process"""
+        try:
+            for container in self.client.containers.list(all=True, filters={"label": POOL_LABEL}):
+                container.remove(force=True)
+        except Exception as e:
+            logging.error(f"Failed to remove stale warm containers - {e}")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                f"{image} script {script_id}" + ("" if network_enabled else " (no network)"): len(idle)
+                for (image, network_enabled, script_id), idle in self.idle.items()
+            }
+
+    def shutdown(self) -> None:
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        with self._lock:
+            containers = [w for idle in self.idle.values() for w in idle]
+            self.idle.clear()
+        for warm in containers:
+            self._remove(warm)
@@ -1,6 +1,7 @@
 import os
 import datetime
-from ....modules.parsing import make_table_page
+from ....modules.parsing import make_table_page, TableColumn
+from ....modules.query_counter import query_budget
 from flask import (
     Blueprint,
     render_template,
@@ -10,6 +11,7 @@ from flask import (
     request
 )
 from flask_login import current_user
+from sqlalchemy.orm import load_only
 from ..models import (
     app,
     db,
@@ -20,6 +22,7 @@ from ..models import (
     ACTION_ENUM
 )
 from ..forms import EditWorkflowForm
+from .execution_plan import drop_execution_plans
 
 blueprint = Blueprint(
     'workflows',
@@ -31,8 +34,11 @@ blueprint = Blueprint(
 
 @blueprint.route('/')
 @app.permission_required(app.models.core.PERMISSION_ENUM.ADMIN)
+@query_budget(4)
 def index():
-    workflows = Workflow.query.all()
+    workflows = Workflow.query.options(
+        load_only(Workflow.id, Workflow.name, Workflow.edited_at)
+    )
     new_button = app.wtf.cd.table_button(
         "New Workflow",
         url_args=["docker.workflows.create",{}],
@@ -42,21 +48,20 @@ def index():
     page = make_table_page(
         "workflows",
         title = "Docker Workflows",
+        query = workflows,
         columns = [
-            "Workflow",
-            "Actions",
-            # "Created",
-            # "Creator",
-            "Updated",
-            # "Editor",
-        ],
-        rows = [
-            (
-                app.wtf.a(
+            TableColumn(
+                "Workflow",
+                lambda workflow: app.wtf.a(
                     f"[{workflow.id}] {workflow.name}",
                     href=url_for('docker.workflows.view', workflow_id=workflow.id)
                 ),
-                app.wtf.cd.table_button_row(
+                sort=Workflow.id,
+                search=[Workflow.id, Workflow.name]
+            ),
+            TableColumn(
+                "Actions",
+                lambda workflow: app.wtf.cd.table_button_row(
                     app.wtf.cd.table_icon_button(
                         ('docker.workflows.edit',{'workflow_id':workflow.id}),
                         classes="bi-pencil",
@@ -67,13 +72,13 @@ def index():
                         classes="bi-trash",
                         tooltip='Delete Workflow'
                     )
-                ),
-                # workflow.created_at_pretty,
-                # workflow.creator.name,
-                workflow.edited_at_pretty,
-                # workflow.last_editor.name,
-            )
-            for workflow in workflows 
+                )
+            ),
+            TableColumn(
+                "Updated",
+                lambda workflow: workflow.edited_at_pretty,
+                sort=Workflow.edited_at
+            ),
         ],
         header_elements=[new_button] if current_user.is_admin else [],
     )
@@ -92,6 +97,8 @@ def create():
             description=form.description.data,
             details=form.details.data,
             environment=form.environment.data,
+            dependencies=form.dependencies.data,
+            max_parallel=form.max_parallel.data or 1,
         )
         db.session.add(workflow)
         db.session.commit()
@@ -132,7 +139,9 @@ def edit(workflow_id):
         "last_editor_id" : workflow.last_editor_id,
         "edited_at" : workflow.edited_at,
         'tasks':  used_task_ids,
-        "environment": workflow.environment
+        "environment": workflow.environment,
+        "dependencies": workflow.dependencies,
+        "max_parallel": workflow.max_parallel
     }
 
     if request.method == "POST" and form.validate_on_submit():
@@ -152,7 +161,9 @@ def edit(workflow_id):
             "details" : form.details.data,
             "description": form.description.data,
             "tasks" : workflow.prioritized_task_ids,
-            "environment": form.environment.data
+            "environment": form.environment.data,
+            "dependencies": form.dependencies.data,
+            "max_parallel": form.max_parallel.data or 1
         }
         for k, v in after.items():
             if k == "tasks":
@@ -217,5 +228,7 @@ def delete(workflow_id):
     WorkflowTaskAssociation.query.filter_by(workflow_id=workflow.id).delete()
     db.session.delete(workflow)
     db.session.commit()
+    # Deletes aren't logged as edits, drop the plan here
+    drop_execution_plans(workflow.id)
     flash('Docker Workflow deleted successfully!', 'success')
     return redirect(url_for('docker.workflows.index'))
\ No newline at end of file
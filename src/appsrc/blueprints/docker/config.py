@@ -6,5 +6,70 @@ NAV_LINKS = {
         "Triggers":     "docker.triggers.index",
         "Scheduler":    "docker.scheduler.index",
         "Scripts":    "docker.scripts.index",
+        "Runs":       "docker.runs.index",
     }
 }
+
+# Run logs are buffered in memory and written in batches
+RUN_LOG_FLUSH_LINES = 200 # Flush after this many buffered lines
+RUN_LOG_FLUSH_BYTES = 64 * 1024 # Flush after this many buffered bytes
+RUN_LOG_FLUSH_INTERVAL = 1.0 # Seconds between background flushes
+
+# Finished run logs are compressed into the LogArchive table in the background
+RUN_LOG_COMPRESSION = "zstd" # "zstd" or "zlib", zstd falls back to zlib if not installed
+RUN_LOG_COMPACTION_BATCH = 100 # Max logs compacted per background run
+RUN_LOG_COMPACTION_INTERVAL = 5 # Minutes
+
+# Run log retention, enforced by a background purge job
+# Keys are log table names, missing tables use "default", None disables a limit
+RUN_LOG_RETENTION = {
+    "default": {
+        "max_age_days": 90, # Delete finished logs older than this
+        "max_count": 500, # Keep at most this many logs per trigger / workflow / task / script
+    },
+    "WorkflowScriptRunLog": {"max_age_days": 30, "max_count": 200},
+    "WorkflowScriptScheduledRunLog": {"max_age_days": 30, "max_count": 200},
+}
+RUN_LOG_PURGE_BATCH = 1000 # Max rows deleted per transaction
+RUN_LOG_PURGE_MAX_BATCHES = 50 # Max batches per table per background run
+RUN_LOG_PURGE_INTERVAL = 60 # Minutes
+RUN_LOG_STALE_HOURS = 24 # Running logs older than this were left by runs lost to a restart, retention treats them as finished
+
+LOG_PAGE_SIZE = 50 # Logs shown per page on view pages, older pages are loaded on demand
+LOG_MESSAGE_PAGE_LINES = 2000 # Lines of a run log shown per page on log stack pages, newest first
+
+# Trigger runs are executed by a fixed pool of workers fed by a bounded queue
+RUN_ENGINE_WORKERS = 4 # Max concurrent trigger runs
+RUN_ENGINE_QUEUE_SIZE = 100 # Max queued runs, further runs are rejected with a 429
+RUN_ENGINE_HISTORY = 50 # Finished runs kept for the runs page
+RUN_OUTPUT_HISTORY = 2000 # Output lines kept per run for viewers resuming with Last-Event-ID
+RUN_ENGINE_RETRY_AFTER = 10 # Seconds, sent in the Retry-After header of rejected runs
+SCHEDULE_MAX_ACTIVE_RUNS = 3 # Scheduled firings are skipped while this many runs of the schedule are queued / running
+
+# Workflow tasks run as a dependency graph, see Workflow.dependencies
+WORKFLOW_MAX_PARALLEL = 8 # Upper bound on a workflow's max parallel tasks
+
+# Shared Docker client, see modules/docker_client.py
+DOCKER_BASE_URL = None # Daemon url, None uses DOCKER_HOST / the default socket
+DOCKER_POOL_SIZE = 32 # Max pooled connections to the daemon
+DOCKER_TIMEOUT = 60 # Seconds before daemon requests time out
+DOCKER_HEALTH_INTERVAL = 30 # Seconds between daemon pings, the client is rebuilt if one fails
+CONTAINER_INDEX_RETRY = 5 # Seconds before the container index reconnects to the events stream
+LOG_FOLLOW_TAIL = 100 # Lines replayed to new container log viewers
+LOG_FOLLOW_BUFFER = 1000 # Lines buffered per log viewer, older lines are dropped for slow viewers
+RUN_LOG_TAIL = 1000 # Earlier lines of each compose container copied into its run log when attaching
+
+COMPOSE_ENGINE = "cli" # "cli" shells out to docker compose, "sdk" runs a subset of compose files in process
+TEMPLATE_CACHE_SIZE = 256 # Compiled task / script templates kept in memory
+
+# Script images are cached by a hash of their template, dependencies and script
+SCRIPT_IMAGE_REPOSITORY = "cetadash-script" # Local repository cached images are tagged in
+SCRIPT_BASE_IMAGE_REPOSITORY = "cetadash-script-base" # Repository for shared script dependency images
+SCRIPT_IMAGE_CACHE_MAX_BYTES = 10 * 1024**3 # Least recently used images are removed above this size
+SCRIPT_IMAGE_EVICTION_GRACE = 30 # Minutes, images used more recently are never evicted so starting runs keep theirs
+
+# Scripts with use_warm_pool run in pre-started containers of their dependency image
+WARM_POOL_SIZE = 2 # Idle containers kept per script, containers are never shared between scripts
+WARM_POOL_IDLE_TTL = 300 # Seconds an idle container is kept
+WARM_POOL_MAX_REUSE = 50 # Runs before a container is replaced
+WARM_POOL_PRUNE_INTERVAL = 1 # Minutes between idle container pruning
@@ -10,9 +10,9 @@ from wtforms import (
     SelectField,
     HiddenField
 )
-from wtforms.validators import DataRequired, Length, Optional, NumberRange
+from wtforms.validators import DataRequired, Length, Optional, NumberRange, ValidationError
 from wtforms_sqlalchemy.fields import QuerySelectField
-from .models import Workflow, WorkflowScript, ScheduleTrigger
+from .models import Workflow, WorkflowScript, ScheduleTrigger, parse_task_dependencies, build_dependency_graph
 
 
 def query_workflows():
@@ -30,8 +30,25 @@ class EditWorkflowForm(FlaskForm):
     details = TextAreaField('Details (MD)')
     description = StringField('Description ', validators=[Length(min=0, max=256)])
     environment = TextAreaField('Environment Variables (ENV)')
+    dependencies = TextAreaField('Task Dependencies (YAML)', validators=[Optional()])
+    max_parallel = IntegerField('Max Parallel Tasks', default=1, validators=[Optional(), NumberRange(min=1)])
     submit = SubmitField('Save Workflow')
 
+    def validate_dependencies(self, field):
+        try:
+            dependencies = parse_task_dependencies(field.data)
+            priorities = {int(_id): index for index, _id in enumerate(self.tasks.data)}
+        except ValueError as e:
+            raise ValidationError(str(e))
+        referenced = set(dependencies).union(*dependencies.values())
+        unknown = referenced - priorities.keys()
+        if unknown:
+            raise ValidationError(f"Task dependencies reference tasks not in this workflow {sorted(unknown)}")
+        try:
+            build_dependency_graph(priorities, dependencies)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
 
 class EditWorkflowTaskForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired(), Length(min=3, max=100)])
@@ -104,6 +121,7 @@ class EditScriptForm(FlaskForm):
     description = TextAreaField("Description ", validators=[Optional()])
     details = TextAreaField("Details", validators=[Optional()])
     network_enabled = BooleanField("Network Enabled", default=True)
+    use_warm_pool = BooleanField("Use Warm Container Pool", default=False)
     environment = TextAreaField("Environment Variables (ENV)", validators=[Optional()])
     dependencies = TextAreaField("Dependencies", validators=[Optional()])
     script = TextAreaField("Script", validators=[Optional()])
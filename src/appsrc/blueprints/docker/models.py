@@ -1,9 +1,10 @@
 import os
 import datetime
 import logging
+import yaml
 from flask_login import UserMixin, current_user
 from sqlalchemy import func as sqlfunc
-from sqlalchemy.orm import backref
+from sqlalchemy.orm import backref, selectinload, undefer
 from sqlalchemy.ext.declarative import declared_attr
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.datastructures import ImmutableDict
@@ -14,11 +15,23 @@ from ...models import (
     BaseLog,
     BaseEditLog,
     BaseActionLog,
+    LogChunk,
+    LogArchive,
+    load_log_storage,
+    add_missing_columns,
     SYSTEM_ID,
     ACTION_ENUM,
     STATUS_ENUM
 )
 
+# Run log statuses that are only set once a run has finished,
+# TASK is set while a failed run is still being wrapped up
+FINISHED_STATUSES = (
+    STATUS_ENUM.SUCCESS,
+    STATUS_ENUM.FAILURE,
+    STATUS_ENUM.HEADERS,
+)
+
 DEFAULT_HEADER_MAPPING = """
 mappings:
     Remote-User:
@@ -104,6 +117,7 @@ class WorkflowTaskEditLog(BaseEditLog):
         foreign_keys=[task_id],
         backref=backref(
             "edit_logs",
+            lazy="dynamic",
             order_by="WorkflowTaskEditLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -123,6 +137,7 @@ class WorkflowTaskRunLog(BaseActionLog):
         foreign_keys=[task_id], 
         backref=backref(
             "run_logs",
+            lazy="dynamic",
             order_by="WorkflowTaskRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -156,6 +171,7 @@ class WorkflowTaskScheduledRunLog(BaseActionLog):
         foreign_keys=[task_id],
         backref=backref(
             "scheduled_run_logs",
+            lazy="dynamic",
             order_by="WorkflowTaskScheduledRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -182,10 +198,72 @@ class WorkflowTaskScheduledRunLog(BaseActionLog):
 ####################
 # Workflows
 ####################
+def parse_task_dependencies(text:str) -> dict[int, list[int]]:
+    """
+    Parses a workflow's task dependencies, a YAML mapping of
+    task id to the task ids it waits for eg. {3: [1, 2], 4: []}
+    """
+    if not text or not text.strip():
+        return {}
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Task dependencies are not valid YAML - {e}")
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("Task dependencies must be a mapping of task id to a list of task ids")
+    dependencies = {}
+    for task_id, depends_on in data.items():
+        if depends_on is None:
+            depends_on = []
+        elif not isinstance(depends_on, list):
+            depends_on = [depends_on]
+        try:
+            dependencies[int(task_id)] = [int(d) for d in depends_on]
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid task id in dependencies of task {task_id}")
+    return dependencies
+
+
+def build_dependency_graph(
+    priorities:dict[int, int],
+    dependencies:dict[int, list[int]]
+) -> dict[int, set[int]]:
+    """
+    Maps each task id in priorities to the ids of the tasks it waits for
+    Tasks wait for every task with a lower priority unless dependencies
+    list them explicitly, raises ValueError if the graph has a cycle
+    """
+    graph = {}
+    for task_id, priority in priorities.items():
+        if task_id in dependencies:
+            graph[task_id] = set(dependencies[task_id]) & priorities.keys()
+        else:
+            graph[task_id] = {t for t, p in priorities.items() if p < priority}
+    # Reject cycles up front instead of deadlocking mid run
+    remaining = {k: set(v) for k, v in graph.items()}
+    while remaining:
+        ready = [k for k, v in remaining.items() if not v]
+        if not ready:
+            raise ValueError(f"Task dependencies contain a cycle between tasks {sorted(remaining)}")
+        for k in ready:
+            del remaining[k]
+        for v in remaining.values():
+            v.difference_update(ready)
+    return graph
+
+
 class Workflow(BaseEditable):
     __tablename__ = "Workflow"
     __bind_key__ = "cetadash_db"
     environment = db.Column(db.Text, default="")
+    dependencies = db.Column(db.Text, default="")
+    max_parallel = db.Column(db.Integer, nullable=False, default=1)
+
+    @property
+    def parsed_dependencies(self) -> dict[int, list[int]]:
+        return parse_task_dependencies(self.dependencies)
     
     @property
     def prioritized_tasks(self):
@@ -272,6 +350,7 @@ class WorkflowEditLog(BaseEditLog):
         foreign_keys=[workflow_id],
         backref=backref(
             "edit_logs",
+            lazy="dynamic",
             order_by="WorkflowEditLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -291,6 +370,7 @@ class WorkflowRunLog(BaseActionLog):
         foreign_keys=[workflow_id],
         backref=backref(
             "run_logs",
+            lazy="dynamic",
             order_by="WorkflowRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -324,6 +404,7 @@ class WorkflowScheduledRunLog(BaseActionLog):
         foreign_keys=[workflow_id],
         backref=backref(
             "schedule_run_logs",
+            lazy="dynamic",
             order_by="WorkflowScheduledRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -427,6 +508,7 @@ class WorkflowTriggerEditLog(BaseEditLog):
         foreign_keys=[trigger_id],
         backref=backref(
             "edit_logs",
+            lazy="dynamic",
             order_by="WorkflowTriggerEditLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -446,6 +528,7 @@ class WorkflowTriggerRunLog(BaseActionLog):
         foreign_keys=[trigger_id],
         backref=backref(
             "run_logs",
+            lazy="dynamic",
             order_by="WorkflowTriggerRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -573,6 +656,7 @@ class ScheduleTriggerEditLog(BaseEditLog):
         foreign_keys=[schedule_trigger_id],
         backref=backref(
             "edit_logs",
+            lazy="dynamic",
             order_by="ScheduleTriggerEditLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -592,6 +676,7 @@ class ScheduleTriggerRunLog(BaseActionLog):
         foreign_keys=[schedule_trigger_id],
         backref=backref(
             "run_logs",
+            lazy="dynamic",
             order_by="ScheduleTriggerRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -613,6 +698,8 @@ class WorkflowScript(BaseEditable):
     dependencies = db.Column(db.Text, default="")
     network_enabled = db.Column(db.Boolean, default=True)
     language = db.Column(db.Text, default="python")
+    # Run in a pre-started container instead of a fresh compose project
+    use_warm_pool = db.Column(db.Boolean, default=False)
    
     def log_edit(
         self,
@@ -656,6 +743,23 @@ class WorkflowScript(BaseEditable):
         )
 
 
+class ScriptImage(db.Model):
+    """
+    Docker images built for WorkflowScripts, keyed by a hash of
+    the language template, dependencies, and script they were built from
+    """
+    __tablename__ = "ScriptImage"
+    __bind_key__ = "cetadash_db"
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(64), unique=True, nullable=False)
+    tag = db.Column(db.String(200), nullable=False)
+    language = db.Column(db.String(100), default="python")
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
 class WorkflowScriptEditLog(BaseEditLog):
     __tablename__ = "WorkflowScriptEditLog"
     __bind_key__ = "cetadash_db"
@@ -669,6 +773,7 @@ class WorkflowScriptEditLog(BaseEditLog):
         foreign_keys=[script_id],
         backref=backref(
             "edit_logs",
+            lazy="dynamic",
             order_by="WorkflowScriptEditLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -688,6 +793,7 @@ class WorkflowScriptRunLog(BaseActionLog):
         foreign_keys=[script_id], 
         backref=backref(
             "run_logs",
+            lazy="dynamic",
             order_by="WorkflowScriptRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -723,6 +829,7 @@ class WorkflowScriptScheduledRunLog(BaseActionLog):
         foreign_keys=[script_id],
         backref=backref(
             "scheduled_run_logs",
+            lazy="dynamic",
             order_by="WorkflowScriptScheduledRunLog.id.desc()",
             cascade="all, delete-orphan"
         )
@@ -745,6 +852,44 @@ class WorkflowScriptScheduledRunLog(BaseActionLog):
     )
 
 
+def load_log_stack(trigger_log) -> list:
+    """
+    Loads the workflow, task, and script logs of a trigger log in bulk
+    with their messages undeferred and their archives / chunks, for the single log pages
+    Returns the logs in stack order, the trigger log first
+    """
+    if isinstance(trigger_log, ScheduleTriggerRunLog):
+        workflow_model = WorkflowScheduledRunLog
+        task_model = WorkflowTaskScheduledRunLog
+        script_model = WorkflowScriptScheduledRunLog
+        task_logs = WorkflowScheduledRunLog.scheduled_task_logs
+        script_log = WorkflowTaskScheduledRunLog.script_scheduled_run_log
+        filters = {"schedule_trigger_log_id": trigger_log.id}
+    else:
+        workflow_model = WorkflowRunLog
+        task_model = WorkflowTaskRunLog
+        script_model = WorkflowScriptRunLog
+        task_logs = WorkflowRunLog.task_logs
+        script_log = WorkflowTaskRunLog.script_run_log
+        filters = {"trigger_log_id": trigger_log.id}
+    workflow_logs = workflow_model.query.options(
+        undefer(workflow_model.message),
+        selectinload(task_logs)
+            .undefer(task_model.message)
+            .selectinload(script_log)
+            .undefer(script_model.message)
+    ).filter_by(**filters).all()
+    logs = [trigger_log]
+    for workflow_log in workflow_logs:
+        logs.append(workflow_log)
+        for task_log in getattr(workflow_log, task_logs.key):
+            logs.append(task_log)
+            if (script := getattr(task_log, script_log.key)) is not None:
+                logs.append(script)
+    load_log_storage(logs)
+    return logs
+
+
 test_data = {
 
     "scripts": [
@@ -853,6 +998,8 @@ def init_db(app):
     with app.app_context():
         logging.info("Initializing Docker Plugin db")
         db.create_all(bind_key=["cetadash_db"])
+        # Existing installs predate columns like Workflow.dependencies
+        add_missing_columns("cetadash_db")
 
         app.models.docker = ImmutableDict()
         for obj in (
@@ -862,6 +1009,7 @@ def init_db(app):
             WorkflowScriptEditLog,
             WorkflowScriptRunLog,
             WorkflowScriptScheduledRunLog,
+            ScriptImage,
             WorkflowTask,
             WorkflowTaskEditLog,
             WorkflowTaskRunLog,
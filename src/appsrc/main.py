@@ -35,6 +35,8 @@ from .modules.parsing import (
     recursive_update
 )
 from .modules.task_manager import BackgroundTaskManager
+from .modules.user_cache import UserCache
+from .modules.network import TrustedProxyMatcher
 from .modules.plugin import load_plugin_config, get_blueprints
 from .modules.WTFScript import WTFHtmlFlask
 
@@ -176,14 +178,17 @@ logging.config.dictConfig(app.config["LOG_CONFIG"])
 ### Set up (non-docker) background task scheduler
 BackgroundTaskManager(app)
 
-db_host = os.environ["DB_HOST"]
-db_port = os.environ["DB_PORT"]
-db_user = os.environ["DB_USER"]
-db_pass = os.environ["DB_PASSWORD"]
-db_name = os.environ["DB_NAME"]
+# DB_URI overrides the MySQL settings, eg. a sqlite file for tests
+if not (db_uri := os.environ.get("DB_URI")):
+    db_host = os.environ["DB_HOST"]
+    db_port = os.environ["DB_PORT"]
+    db_user = os.environ["DB_USER"]
+    db_pass = os.environ["DB_PASSWORD"]
+    db_name = os.environ["DB_NAME"]
+    db_uri = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
 
 app.config["SQLALCHEMY_BINDS"] = {
-    "cetadash_db" : f"mysql+pymysql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+    "cetadash_db" : db_uri
 } 
 
 def with_app():
@@ -235,9 +240,14 @@ from .models import (
 init_db(app)
 
 ### Login
+# Users seen by permission_required, saves the user queries on every request
+app.user_cache = UserCache(db, app.config.get("USER_CACHE_TTL", 300))
 # Define user loader for login
 def user_loader(user_id):
-    return app.models.core.User.query.get(int(user_id))
+    user = app.user_cache.get_by_id(int(user_id))
+    if user is None:
+        user = app.models.core.User.query.get(int(user_id))
+    return user
 app.user_loader = user_loader
 # Set up logins
 app.login_manager = login_manager = LoginManager()
@@ -260,13 +270,9 @@ DefaultPermission = 0
 
 from flask import abort, request
 import logging
-import fnmatch
 
-def is_trusted_ip(remote_addr: str, trusted_ips: list) -> bool:
-    for ip in trusted_ips:
-        if fnmatch.fnmatch(remote_addr, ip):
-            return True
-    return False
+# Compiled once, permission_required checks every request against it
+app.trusted_proxies = TrustedProxyMatcher(app.config['TRUSTED_PROXY_IPS'])
 
 def get_permission_from_groups(groups):
     """Assigns the highest permission level from group memberships"""
@@ -280,7 +286,7 @@ def permission_required(required_permission):
             remote_addr = request.remote_addr
             logging.info(remote_addr)
             remote_addr = request.remote_addr
-            if not is_trusted_ip(remote_addr, app.config['TRUSTED_PROXY_IPS']):
+            if not app.trusted_proxies.is_trusted(remote_addr):
                 logging.warning("Untrusted proxy: %s", remote_addr)
                 return abort(403)
 
@@ -292,19 +298,21 @@ def permission_required(required_permission):
                 if grp.strip()
             ]
             permission = get_permission_from_groups(group_list)
-            if not app.models.core.User.query.filter_by(name=username).first():
-                user = app.models.core.User(
-                    name=username,
-                    permission_integer=permission
-                )
-                db.session.add(user)
-                db.session.commit()
-            else:
+            # Cached per header pair, so a cached user already has this permission
+            user = app.user_cache.get(username, groups)
+            if user is None:
                 user = app.models.core.User.query.filter_by(name=username).first()
-
-                if not permission == user.permission_integer:
+                if not user:
+                    user = app.models.core.User(
+                        name=username,
+                        permission_integer=permission
+                    )
+                    db.session.add(user)
+                    db.session.commit()
+                elif not permission == user.permission_integer:
                     user.permission_integer = permission
                     db.session.commit()
+                app.user_cache.put(username, groups, user)
 
             if not current_user.is_authenticated:
                 login_user(user)
@@ -376,6 +384,7 @@ def apply_theme():
     selected_theme = request.form.get('theme')
     current_user.selected_theme = selected_theme
     db.session.commit()
+    app.user_cache.invalidate(current_user.id)
     return redirect(request.referrer or '/')
 
 @app.route('/apply_editor_theme', methods=['POST'])
@@ -383,6 +392,7 @@ def apply_editor_theme():
     selected_editor_theme = request.form.get('editor_theme')
     current_user.selected_editor_theme = selected_editor_theme
     db.session.commit()
+    app.user_cache.invalidate(current_user.id)
     return redirect(request.referrer or '/')
 
 @app.route('/usermeta')
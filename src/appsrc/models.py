@@ -9,15 +9,23 @@ import datetime
 import logging
 from random import choice
 from string import ascii_lowercase
+from blinker import Namespace
 from flask_login import UserMixin, current_user
-from sqlalchemy import func as sqlfunc
+from sqlalchemy import func as sqlfunc, event, inspect, and_, or_
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import defer, joinedload
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.datastructures import ImmutableDict
 from .main import app, db
+from .modules.log_compression import compress_text, decompress_text
 
 
 SYSTEM_ID = 999 # ID For built-in system user
+
+# Sent with the edited object whenever an edit is logged,
+# lets caches built from editable models drop stale entries
+model_signals = Namespace()
+edited = model_signals.signal("edited")
 PERMISSION_MAP = {
     1 : "EVERYONE",
     5 : "USER",
@@ -159,10 +167,34 @@ class BaseEditable(db.Model):
         return app.wtf.pretty_date(self.edited_at_local)
     
     def log_edit(self, log_cls, user_id:int = None, action:int = ACTION_ENUM.MODIFY, **kw):
-        return handle_log(log_cls, user_id, action=action, **kw)
+        log = handle_log(log_cls, user_id, action=action, **kw)
+        edited.send(self, action=action)
+        return log
     
     def log_run(self, log_cls, user_id:int = None, status:int = STATUS_ENUM.RUNNING, **kw):
         return handle_log(log_cls, user_id, status=status, **kw)
+
+    def log_page(self, name:str, before:int = None, limit:int = None) -> tuple[list, int]:
+        """
+        Returns a page of logs from a log relationship, newest first,
+        and the id to pass as before to get the next page (None on the last page)
+        """
+        limit = limit or app.config.get("LOG_PAGE_SIZE", 50)
+        logs = getattr(self, name)
+        if hasattr(logs, "filter"):
+            model = logs.column_descriptions[0]["entity"]
+            if before:
+                logs = logs.filter(model.id < before)
+            logs = (
+                logs.options(defer(model.message), joinedload(model.user))
+                .limit(limit + 1)
+                .all()
+            )
+        else:
+            logs = [l for l in logs if not before or l.id < before][:limit + 1]
+        if len(logs) > limit:
+            return logs[:limit], logs[limit - 1].id
+        return logs, None
         
 class BaseLog(db.Model):
     """Base class for Cetadash Run and Edit logs"""
@@ -180,7 +212,8 @@ class BaseLog(db.Model):
         return db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
     @declared_attr
     def message(cls):
-        return db.Column(db.Text)
+        # Deferred so log listings don't load message bodies
+        return db.deferred(db.Column(db.Text))
     @property
     def timestamp_local(self):
         return app.wtf.localize(self.timestamp)
@@ -194,15 +227,215 @@ class BaseEditLog(BaseLog):
     action = db.Column(db.Integer, nullable=False, default=ACTION_ENUM.CREATE)
 
 
+class LogChunk(db.Model):
+    """
+    Append-only storage for run log output
+    Rows are keyed by the log's table name, the log id, and a sequence number
+    """
+    __tablename__ = "LogChunk"
+    __bind_key__ = "cetadash_db"
+    __table_args__ = (
+        db.UniqueConstraint("log_type", "log_id", "sequence"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    log_type = db.Column(db.String(100), nullable=False)
+    log_id = db.Column(db.Integer, nullable=False)
+    sequence = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text(2**24), nullable=False, default="")
+
+    @classmethod
+    def for_log(cls, log_type:str, log_id:int):
+        return cls.query.filter_by(
+            log_type=log_type,
+            log_id=log_id
+        ).order_by(cls.sequence.asc())
+
+    @classmethod
+    def next_sequence(cls, log_type:str, log_id:int) -> int:
+        last = db.session.query(sqlfunc.max(cls.sequence)).filter_by(
+            log_type=log_type,
+            log_id=log_id
+        ).scalar()
+        return 0 if last is None else last + 1
+
+    @classmethod
+    def read(cls, log_type:str, log_id:int, start:int = 0, limit:int = None) -> list:
+        """Returns chunks for a log starting at a sequence number"""
+        query = cls.for_log(log_type, log_id).filter(cls.sequence >= start)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    @classmethod
+    def delete_for(cls, log_type:str, log_ids:list) -> int:
+        return cls.query.filter(
+            cls.log_type == log_type,
+            cls.log_id.in_(log_ids)
+        ).delete(synchronize_session=False)
+
+
+class LogArchive(db.Model):
+    """Compressed text of run logs that have finished running"""
+    __tablename__ = "LogArchive"
+    __bind_key__ = "cetadash_db"
+    __table_args__ = (
+        db.UniqueConstraint("log_type", "log_id"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    log_type = db.Column(db.String(100), nullable=False)
+    log_id = db.Column(db.Integer, nullable=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    data = db.Column(db.LargeBinary(2**32 - 1), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    @classmethod
+    def create(cls, log_type:str, log_id:int, text:str, codec:int) -> object:
+        archive = cls(
+            log_type=log_type,
+            log_id=log_id,
+            size=len(text.encode("utf-8")),
+            data=compress_text(text, codec)
+        )
+        db.session.add(archive)
+        return archive
+
+    @classmethod
+    def delete_for(cls, log_type:str, log_ids:list) -> int:
+        return cls.query.filter(
+            cls.log_type == log_type,
+            cls.log_id.in_(log_ids)
+        ).delete(synchronize_session=False)
+
+    @property
+    def text(self) -> str:
+        return decompress_text(self.data)
+
+
 class BaseActionLog(BaseLog):
     __abstract__ = True
     status = db.Column(db.Integer, nullable=False, default=STATUS_ENUM.RUNNING)
 
+    @property
+    def chunks(self):
+        return LogChunk.for_log(self.__tablename__, self.id)
+
+    def append_chunk(self, content:str, sequence:int) -> LogChunk:
+        chunk = LogChunk(
+            log_type=self.__tablename__,
+            log_id=self.id,
+            sequence=sequence,
+            content=content
+        )
+        db.session.add(chunk)
+        return chunk
+
+    @property
+    def archive(self):
+        return LogArchive.query.filter_by(
+            log_type=self.__tablename__,
+            log_id=self.id
+        ).first()
+
+    @property
+    def full_message(self) -> str:
+        """
+        Reassembles the log text from the compressed archive,
+        the legacy message column, and any chunks not yet archived
+        Uses the storage loaded by load_log_storage when there is one
+        """
+        storage = getattr(self, "_log_storage", None)
+        if storage is None:
+            storage = (self.archive, self.chunks.all())
+        archive, chunks = storage
+        return (
+            (archive.text if archive else "")
+            + (self.message or "")
+            + "".join(c.content for c in chunks)
+        )
+
+    def message_page(self, page:int = 0, page_size:int = None) -> tuple[str, int]:
+        """
+        Returns a page of the log's lines counted back from the end, page 0 is the newest,
+        and the number of pages, so log pages don't send whole multi-megabyte logs at once
+        """
+        page_size = page_size or app.config.get("LOG_MESSAGE_PAGE_LINES", 2000)
+        lines = self.full_message.split("\n")
+        pages = max(-(-len(lines) // page_size), 1)
+        page = min(max(page, 0), pages - 1)
+        end = len(lines) - page * page_size
+        return "\n".join(lines[max(end - page_size, 0):end]), pages
+
+
+def load_log_storage(logs:list) -> None:
+    """
+    Loads the archives and chunks of many logs with one query each,
+    so rendering their full_message doesn't query per log
+    """
+    by_type = {}
+    for log in logs:
+        by_type.setdefault(log.__tablename__, {})[log.id] = log
+        log._log_storage = (None, [])
+    if not by_type:
+        return
+
+    def for_logs(table):
+        return or_(*(
+            and_(table.log_type == log_type, table.log_id.in_(list(ids)))
+            for log_type, ids in by_type.items()
+        ))
+
+    for archive in LogArchive.query.filter(for_logs(LogArchive)):
+        log = by_type[archive.log_type][archive.log_id]
+        log._log_storage = (archive, log._log_storage[1])
+    for chunk in LogChunk.query.filter(for_logs(LogChunk)).order_by(LogChunk.sequence.asc()):
+        by_type[chunk.log_type][chunk.log_id]._log_storage[1].append(chunk)
+
+
+@event.listens_for(BaseActionLog, "after_delete", propagate=True)
+def _delete_log_storage(mapper, connection, target):
+    for table in (LogChunk, LogArchive):
+        connection.execute(
+            table.__table__.delete().where(
+                table.log_type == target.__tablename__,
+                table.log_id == target.id
+            )
+        )
+
+
+def add_missing_columns(bind_key:str) -> None:
+    """
+    create_all only creates missing tables, this adds columns
+    that were added to existing models since their table was created.
+    Columns are added nullable and existing rows are set to the column's default.
+    """
+    engine = db.engines[bind_key]
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for table in db.metadatas[bind_key].tables.values():
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                logging.info(f"Adding column {table.name}.{column.name}")
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.quote(table.name)} "
+                    f"ADD COLUMN {preparer.quote(column.name)} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                )
+                if column.default is not None and column.default.is_scalar:
+                    connection.execute(
+                        table.update().values({column.name: column.default.arg})
+                    )
+
 
 def init_db(app):
     with app.app_context():
         logging.info("Initializing Users db")
         db.create_all(bind_key=["cetadash_db"])
+        add_missing_columns("cetadash_db")
         # Check if secret key exists in database, generate one if necessary
         # This key is used to maintain user sessions across application restarts
         # It is also used to reduce the chance of impersonation attacks
@@ -242,6 +475,8 @@ def init_db(app):
         for obj in (
             User,
             SecretKey,
+            LogChunk,
+            LogArchive,
             PERMISSION_ENUM,
             ACTION_ENUM,
             STATUS_ENUM,
@@ -0,0 +1,83 @@
+import time
+import logging
+import threading
+import docker
+
+
+class DockerClientManager:
+    """
+    Process wide Docker client shared by every blueprint and worker.
+    The client is created on first use with a sized connection pool,
+    pinged at most every health_interval seconds and rebuilt if the daemon
+    stopped answering. Attribute access is forwarded to the current client,
+    so the manager can be used in place of docker.from_env().
+    """
+    def __init__(
+        self,
+        base_url:str = None,
+        pool_size:int = 32,
+        timeout:int = 60,
+        health_interval:int = 30
+    ):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._client = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> docker.DockerClient:
+        if self.base_url:
+            return docker.DockerClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_pool_size=self.pool_size
+            )
+        return docker.DockerClient.from_env(
+            timeout=self.timeout,
+            max_pool_size=self.pool_size
+        )
+
+    @property
+    def client(self) -> docker.DockerClient:
+        """The shared client, health checked and reconnected as needed"""
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+                self._checked_at = time.monotonic()
+            elif time.monotonic() - self._checked_at > self.health_interval:
+                try:
+                    self._client.ping()
+                except Exception as e:
+                    logging.error(f"Docker daemon health check failed, reconnecting - {e}")
+                    self._close()
+                    self._client = self._connect()
+                self._checked_at = time.monotonic()
+            return self._client
+
+    def __getattr__(self, name:str):
+        return getattr(self.client, name)
+
+    def healthy(self) -> bool:
+        try:
+            return bool(self.client.ping())
+        except Exception:
+            return False
+
+    def reconnect(self) -> docker.DockerClient:
+        with self._lock:
+            self._close()
+        return self.client
+
+    def _close(self) -> None:
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
@@ -0,0 +1,59 @@
+import zlib
+import struct
+import logging
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Header is the magic bytes, the codec id, and the uncompressed size
+MAGIC = b"CDLZ"
+HEADER = struct.Struct(">4sBQ")
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {
+    "zlib": CODEC_ZLIB,
+    "zstd": CODEC_ZSTD,
+}
+
+
+_warned = set()
+
+
+def get_codec(name:str = "zstd") -> int:
+    """Resolves a codec name, falls back to zlib if zstandard is missing"""
+    codec = CODEC_NAMES.get(name, CODEC_ZLIB)
+    if codec == CODEC_ZSTD and zstandard is None:
+        if name not in _warned:
+            _warned.add(name)
+            logging.warning("zstd log compression requested but zstandard isn't installed, using zlib")
+        return CODEC_ZLIB
+    return codec
+
+
+def compress_text(text:str, codec:int = CODEC_ZLIB, level:int = 6) -> bytes:
+    """Compresses a string into a blob with a small header"""
+    raw = text.encode("utf-8")
+    if codec == CODEC_ZSTD:
+        data = zstandard.ZstdCompressor(level=level).compress(raw)
+    else:
+        data = zlib.compress(raw, level)
+    return HEADER.pack(MAGIC, codec, len(raw)) + data
+
+
+def decompress_text(blob:bytes) -> str:
+    """Decompresses a blob created by compress_text"""
+    magic, codec, size = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a compressed log blob")
+    data = blob[HEADER.size:]
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Log blob requires the zstandard package")
+        raw = zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown log blob codec {codec}")
+    return raw.decode("utf-8")
@@ -1,9 +1,11 @@
 import ipaddress
+import fnmatch
 import socket 
 import subprocess
 import threading
 import logging
 import logging
+from functools import lru_cache
 from typing import Tuple
 
 # def _run_ping(host) -> subprocess.CompletedProcess:
@@ -107,4 +109,72 @@ class Scanner():
         for r in self.ranges:
             online.extend(scan_ip_range(r))
         self.data = resolve_host_names(online)
-        return self.data
\ No newline at end of file
+        return self.data
+
+
+class TrustedProxyMatcher:
+    """
+    Trusted proxy list compiled into ipaddress networks.
+    Entries can be addresses, CIDR networks (IPv4 or IPv6), or whole octet
+    globs like 172.18.0.*, other globs fall back to fnmatch.
+    A lookup is one set check per distinct prefix length, however long the list,
+    and the latest decisions are cached.
+    """
+    def __init__(self, entries:list[str], cache_size:int = 1024):
+        # Version -> prefix length -> (mask, network addresses)
+        self.networks = {4: {}, 6: {}}
+        self.globs = []
+        for entry in entries:
+            self.add(entry)
+        self.is_trusted = lru_cache(maxsize=cache_size)(self._match)
+
+    @staticmethod
+    def glob_network(entry:str):
+        """Network for an IPv4 glob whose wildcards are trailing whole octets, else None"""
+        octets = entry.split(".")
+        if len(octets) != 4 or "*" not in octets:
+            return None
+        fixed = octets[:octets.index("*")]
+        if any(octet != "*" for octet in octets[len(fixed):]):
+            return None
+        try:
+            return ipaddress.ip_network(
+                ".".join(fixed + ["0"] * (4 - len(fixed))) + f"/{8 * len(fixed)}"
+            )
+        except ValueError:
+            return None
+
+    def add(self, entry:str) -> None:
+        entry = entry.strip()
+        if entry == "*":
+            networks = [ipaddress.ip_network("0.0.0.0/0"), ipaddress.ip_network("::/0")]
+        else:
+            try:
+                networks = [ipaddress.ip_network(entry, strict=False)]
+            except ValueError:
+                network = self.glob_network(entry)
+                if network is None:
+                    logging.info(f"Trusted proxy {entry} isn't a network, matching it as a glob")
+                    self.globs.append(entry)
+                    return
+                networks = [network]
+        for network in networks:
+            bits = network.max_prefixlen
+            mask = ((1 << network.prefixlen) - 1) << (bits - network.prefixlen)
+            prefixes = self.networks[network.version]
+            prefixes.setdefault(network.prefixlen, (mask, set()))[1].add(int(network.network_address))
+
+    def _match(self, remote_addr:str) -> bool:
+        try:
+            address = ipaddress.ip_address(remote_addr)
+        except ValueError:
+            address = None
+        if address is not None:
+            # IPv4 clients of a dual stack listener arrive as ::ffff:a.b.c.d
+            if address.version == 6 and address.ipv4_mapped:
+                address = address.ipv4_mapped
+            value = int(address)
+            for mask, networks in self.networks[address.version].values():
+                if (value & mask) in networks:
+                    return True
+        return any(fnmatch.fnmatch(remote_addr or "", glob) for glob in self.globs)
\ No newline at end of file
@@ -2,9 +2,15 @@ import re
 import time
 import datetime
 import requests
-from flask import render_template
+from flask import render_template, request, jsonify
+from sqlalchemy import String, cast, or_, inspect
 from typing import List
 
+# Largest page a server side table will return, DataTables' "All" asks for -1
+MAX_TABLE_PAGE_LENGTH = 1000
+# Escape character for LIKE patterns built from search terms
+LIKE_ESCAPE = "\\"
+
 def recursive_update(d1:dict, d2:dict) -> None:
     """Recursively combine two dictionaries into d1"""
     for key, value in d2.items():
@@ -14,16 +20,98 @@ def recursive_update(d1:dict, d2:dict) -> None:
             d1[key] = value
 
 
+class TableColumn:
+    """
+    Column of a server side table.
+    render turns a query row into the cell's html,
+    sort and search are the SQL expressions paging is pushed down to,
+    search may be a list of expressions, columns without them can't be sorted / searched
+    """
+    def __init__(self, title:str, render:callable, sort=None, search=None):
+        self.title = title
+        self.render = render
+        self.sort = sort
+        if search is None:
+            search = []
+        elif not isinstance(search, (list, tuple)):
+            search = [search]
+        self.search = list(search)
+
+    def matches(self, value:str):
+        """Filter clause matching a search term against any of the column's expressions"""
+        # Search terms are literal, wildcards typed by the user are escaped
+        for character in (LIKE_ESCAPE, "%", "_"):
+            value = value.replace(character, LIKE_ESCAPE + character)
+        return or_(*(
+            cast(expression, String).ilike(f"%{value}%", escape=LIKE_ESCAPE)
+            for expression in self.search
+        ))
+
+
+def query_table_data(query, columns:list[TableColumn], args:dict) -> dict:
+    """
+    Answers a DataTables server side request from a query,
+    searching, sorting, and paging are done by the database
+    """
+    total = query.order_by(None).count()
+    filtered = query
+    if search := args.get("search[value]", "").strip():
+        clauses = [column.matches(search) for column in columns if column.search]
+        if clauses:
+            filtered = filtered.filter(or_(*clauses))
+    for index, column in enumerate(columns):
+        value = args.get(f"columns[{index}][search][value]", "").strip()
+        if value and column.search:
+            filtered = filtered.filter(column.matches(value))
+    filtered_total = total if filtered is query else filtered.order_by(None).count()
+
+    ordering = []
+    index = 0
+    while (column_index := args.get(f"order[{index}][column]", type=int)) is not None:
+        if 0 <= column_index < len(columns) and columns[column_index].sort is not None:
+            sort = columns[column_index].sort
+            ordering.append(sort.desc() if args.get(f"order[{index}][dir]") == "desc" else sort.asc())
+        index += 1
+    if ordering:
+        filtered = filtered.order_by(None).order_by(*ordering)
+    # Primary key last so rows with equal sort values keep a stable order across pages
+    filtered = filtered.order_by(*inspect(query.column_descriptions[0]["entity"]).primary_key)
+
+    start = max(args.get("start", 0, type=int), 0)
+    length = args.get("length", 25, type=int)
+    if length < 0 or length > MAX_TABLE_PAGE_LENGTH:
+        length = MAX_TABLE_PAGE_LENGTH
+    rows = filtered.offset(start).limit(length).all()
+    return {
+        "draw": args.get("draw", 0, type=int),
+        "recordsTotal": total,
+        "recordsFiltered": filtered_total,
+        "data": [[column.render(row) for column in columns] for row in rows],
+    }
+
+
 def make_table_page(
     name:str,
     *args,
     custom_script:str = 'console.log("Table loaded");',
+    query = None,
     **kw
 ) -> str:
     """
     Creates a table page from a list of columns and rows
+    Pass a query and TableColumns instead of rows for a server side table,
+    the page is rendered empty and the same view answers the table's data requests
     """
     script = custom_script
+    if query is not None:
+        columns = kw.pop("columns")
+        if "draw" in request.args:
+            return jsonify(query_table_data(query, columns, request.args))
+        kw.update(
+            columns = [column.title for column in columns],
+            rows = [],
+            ajax_url = request.full_path.rstrip("?")
+        )
     return render_template(
         "pages/table_page.html",
         name = name,
@@ -0,0 +1,61 @@
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a strict query budget is exceeded"""
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    for statements in getattr(_local, "counters", ()):
+        statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """
+    Collects the SQL statements this thread executes inside the block
+        with count_queries() as statements:
+            ...
+        assert len(statements) == 1
+    """
+    statements = []
+    counters = _local.__dict__.setdefault("counters", [])
+    counters.append(statements)
+    try:
+        yield statements
+    finally:
+        counters.remove(statements)
+
+
+def query_budget(limit:int):
+    """
+    Checks a view runs at most limit queries, whatever the number of rows.
+    Apply below permission_required so only the view's own queries are counted,
+    leave room for the current user being reloaded when templates render.
+    Over budget views are logged, or raise QueryBudgetExceeded with QUERY_BUDGET_STRICT.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with count_queries() as statements:
+                result = func(*args, **kwargs)
+            if len(statements) > limit:
+                message = (
+                    f"{func.__module__}.{func.__name__} ran {len(statements)} queries, "
+                    f"budget is {limit}"
+                )
+                if current_app.config.get("QUERY_BUDGET_STRICT", current_app.testing):
+                    raise QueryBudgetExceeded(message + "\n" + "\n".join(statements))
+                logging.warning(message)
+            return result
+        return wrapper
+    return decorator
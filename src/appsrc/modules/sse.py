@@ -0,0 +1,286 @@
+import io
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, stream_with_context
+from werkzeug.exceptions import HTTPException
+from .streams import Subscription
+
+DROPPED_MESSAGE = "🖥️⚠️ {} lines dropped"
+
+
+def event(text:str, event_id:int = None) -> str:
+    if event_id is not None:
+        return f"id: {event_id}\ndata: {text}\n\n"
+    return f"data: {text}\n\n"
+
+
+def event_stream_view(view:callable) -> callable:
+    """
+    Marks a view that returns EventStream.response(),
+    apply below permission_required so the mark is copied onto the wrapper
+    """
+    view.streams_events = True
+    return view
+
+
+class EventStream:
+    """
+    Writes a Subscription as server sent events.
+    Served by WSGI the stream blocks its worker thread on the subscription,
+    served by EventStreamDispatcher it awaits the subscription on the event loop.
+    Streams with item_id send event ids so clients can resume with Last-Event-ID,
+    end_event sends a final "end" event telling those clients not to reconnect.
+    """
+    def __init__(
+        self,
+        subscription:Subscription,
+        prelude:list = (),
+        format_item:callable = str,
+        item_id:callable = None,
+        end:callable = None,
+        end_message:str = None,
+        end_event:bool = False,
+        keepalive:int = 15
+    ):
+        self.subscription = subscription
+        self.prelude = list(prelude)
+        self.format_item = format_item
+        self.item_id = item_id
+        self.end = end
+        self.end_message = end_message
+        self.end_event = end_event
+        self.keepalive = keepalive
+        self.done = False
+
+    def format(self, items:list) -> str:
+        """Formats a batch of items into one write, ending the stream at the first end item"""
+        parts = [event(text) for text in self.prelude]
+        self.prelude = []
+        if dropped := self.subscription.take_dropped():
+            parts.append(event(DROPPED_MESSAGE.format(dropped)))
+        for item in items:
+            if self.end and self.end(item):
+                if self.end_message:
+                    parts.append(event(self.end_message))
+                self.done = True
+                break
+            if text := self.format_item(item):
+                parts.append(event(text, self.item_id(item) if self.item_id else None))
+        if not items and self.subscription.finished:
+            self.done = True
+        if self.done and self.end_event:
+            parts.append("event: end\ndata: \n\n")
+        if not parts and not self.done:
+            # Comment line, keeps proxies from timing out and detects closed clients
+            parts.append(": keepalive\n\n")
+        return "".join(parts)
+
+    def __iter__(self):
+        try:
+            if self.prelude:
+                yield self.format([])
+            while not self.done:
+                chunk = self.format(self.subscription.get(timeout=self.keepalive))
+                if chunk:
+                    yield chunk
+        finally:
+            self.close()
+
+    async def next_chunk(self) -> str:
+        """Next write for the client, None once the stream is finished"""
+        if self.done:
+            return None
+        if self.prelude:
+            return self.format([])
+        return self.format(await self.subscription.wait(timeout=self.keepalive)) or None
+
+    def close(self) -> None:
+        self.done = True
+        self.subscription.close()
+
+    def response(self) -> Response:
+        response = Response(
+            stream_with_context(iter(self)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+        response.event_stream = self
+        return response
+
+
+async def read_body(receive:callable) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return body
+
+
+async def wait_for_disconnect(receive:callable) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def build_environ(scope:dict, body:bytes) -> dict:
+    """WSGI environ of an ASGI http request"""
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1")
+        if name in ("content-length", "content-type"):
+            key = name.upper().replace("-", "_")
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin1")
+        # Repeated headers are joined like a WSGI server would
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def encode_headers(headers) -> list:
+    return [(key.lower().encode("latin1"), value.encode("latin1")) for key, value in headers]
+
+
+class EventStreamDispatcher:
+    """
+    ASGI application in front of the Flask app.
+    Views marked with event_stream_view are dispatched in a worker thread,
+    their event streams are then served from the event loop so viewers don't hold a thread.
+    Everything else runs through the Flask app's WSGI interface on the same threads.
+    Requests run concurrently on a pool of threads sized by ASGI_THREADS.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get("ASGI_THREADS", 24),
+            thread_name_prefix="asgi"
+        )
+
+    def run_wsgi(self, environ:dict, loop, queue:asyncio.Queue) -> None:
+        """
+        Runs a WSGI request in a pool thread, the status, headers, and body chunks
+        are handed to the event loop as they're produced.
+        The body is iterated on this one thread so streamed responses keep their context.
+        """
+        def put(item) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        def start_response(status:str, headers:list, exc_info=None) -> None:
+            put(("start", int(status.split(" ", 1)[0]), headers))
+
+        try:
+            result = self.app(environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk:
+                        put(("body", chunk))
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        finally:
+            put(("end",))
+
+    async def wsgi(self, scope:dict, receive:callable, send:callable) -> None:
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, await read_body(receive))
+        queue = asyncio.Queue()
+        future = loop.run_in_executor(self.executor, self.run_wsgi, environ, loop, queue)
+        while (item := await queue.get())[0] != "end":
+            if item[0] == "start":
+                await send({
+                    "type": "http.response.start",
+                    "status": item[1],
+                    "headers": encode_headers(item[2]),
+                })
+            else:
+                await send({"type": "http.response.body", "body": item[1], "more_body": True})
+        await future
+        await send({"type": "http.response.body", "body": b""})
+
+    def streams_events(self, scope:dict) -> bool:
+        if scope["type"] != "http":
+            return False
+        try:
+            endpoint, _ = self.app.url_map.bind("localhost").match(
+                scope["path"],
+                method=scope["method"]
+            )
+        except HTTPException:
+            return False
+        return getattr(self.app.view_functions.get(endpoint), "streams_events", False)
+
+    def dispatch(self, environ:dict) -> Response:
+        """Runs the full Flask request cycle, so permissions, sessions and hooks still apply"""
+        with self.app.request_context(environ):
+            try:
+                response = self.app.full_dispatch_request()
+            except Exception as e:
+                return self.app.make_response(self.app.handle_exception(e))
+            if getattr(response, "event_stream", None) is not None:
+                # Streamed from the event loop instead, the unused WSGI body is closed in its own context
+                response.close()
+            return response
+
+    async def __call__(self, scope:dict, receive:callable, send:callable) -> None:
+        if not self.streams_events(scope):
+            return await self.wsgi(scope, receive, send)
+        environ = build_environ(scope, await read_body(receive))
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, self.dispatch, environ)
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": encode_headers(response.headers.items()),
+        })
+        stream = getattr(response, "event_stream", None)
+        if stream is None:
+            content = await loop.run_in_executor(self.executor, lambda: b"".join(response.iter_encoded()))
+            await send({"type": "http.response.body", "body": content})
+            return
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            while True:
+                chunk = asyncio.ensure_future(stream.next_chunk())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    break
+                if chunk.result() is None:
+                    break
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk.result().encode("utf-8"),
+                    "more_body": True
+                })
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+            stream.close()
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class Subscription:
+    """
+    Bounded buffer a single consumer reads from.
+    Producers never block, when the buffer is full the oldest item is dropped
+    and counted so the consumer can report the gap.
+    Consumers can block on get() from a thread or await wait() from an event loop,
+    sources counts the producers that must finish before the subscription closes.
+    """
+    def __init__(self, maxlen:int = 1000, sources:int = 0):
+        self.buffer = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.sources = sources
+        self.closed = False
+        self.broadcasters = []
+        self.condition = threading.Condition()
+        self._waiters = []
+
+    def _notify(self) -> None:
+        """Wakes blocked and awaiting consumers, call with the condition held"""
+        self.condition.notify_all()
+        for loop, event in self._waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def put(self, item) -> None:
+        with self.condition:
+            if self.closed:
+                return
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(item)
+            self._notify()
+
+    # Lets a subscription stand in for a queue.Queue producers write to
+    put_nowait = put
+
+    def source_closed(self) -> None:
+        """Called by a broadcaster that won't publish again"""
+        with self.condition:
+            self.sources -= 1
+            if self.sources <= 0:
+                self.closed = True
+            self._notify()
+
+    @contextmanager
+    def attaching(self):
+        """Keeps the subscription open while it is subscribed to several broadcasters"""
+        with self.condition:
+            self.sources += 1
+        try:
+            yield self
+        finally:
+            self.source_closed()
+
+    def get(self, timeout:float = None) -> list:
+        """
+        Waits for items and returns everything buffered,
+        an empty list means the timeout passed or the subscription is finished
+        """
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(timeout)
+            items = list(self.buffer)
+            self.buffer.clear()
+            return items
+
+    async def wait(self, timeout:float = None) -> list:
+        """Awaitable get(), the event loop is woken by producers instead of polling"""
+        with self.condition:
+            if not self.buffer and not self.closed:
+                waiter = (asyncio.get_running_loop(), asyncio.Event())
+                self._waiters.append(waiter)
+            else:
+                waiter = None
+        if waiter:
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self.condition:
+                    self._waiters.remove(waiter)
+        with self.condition:
+            items = list(self.buffer)
+            self.buffer.clear()
+            return items
+
+    def take_dropped(self) -> int:
+        """Returns and resets the number of items dropped since the last call"""
+        with self.condition:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
+
+    @property
+    def finished(self) -> bool:
+        with self.condition:
+            return self.closed and not self.buffer
+
+    def __iter__(self):
+        while True:
+            items = self.get(timeout=1)
+            yield from items
+            if not items and self.finished:
+                return
+
+    def close(self) -> None:
+        """Stops receiving items and unsubscribes from every broadcaster"""
+        with self.condition:
+            self.closed = True
+            self._notify()
+        for broadcaster in list(self.broadcasters):
+            broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """
+    Fans published items out to any number of subscriptions.
+    The last history items are replayed to new subscribers,
+    on_empty is called when the last subscriber leaves.
+    """
+    def __init__(self, history:int = 0, on_empty:callable = None):
+        self.subscribers = []
+        self.history = deque(maxlen=history)
+        self.on_empty = on_empty
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription:Subscription = None, maxlen:int = 1000) -> Subscription:
+        subscription = subscription or Subscription(maxlen)
+        with self._lock:
+            with subscription.condition:
+                subscription.sources += 1
+            subscription.broadcasters.append(self)
+            for item in self.history:
+                subscription.put(item)
+            if self.closed:
+                subscription.source_closed()
+            else:
+                self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription:Subscription) -> None:
+        with self._lock:
+            if subscription not in self.subscribers:
+                return
+            self.subscribers.remove(subscription)
+            empty = not self.subscribers
+        if subscription in subscription.broadcasters:
+            subscription.broadcasters.remove(self)
+        if empty and self.on_empty:
+            self.on_empty(self)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self.subscribers)
+
+    def publish(self, item) -> None:
+        with self._lock:
+            self.history.append(item)
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.put(item)
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            subscribers, self.subscribers = self.subscribers, []
+        for subscription in subscribers:
+            subscription.source_closed()
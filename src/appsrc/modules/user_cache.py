@@ -0,0 +1,71 @@
+import time
+import threading
+from sqlalchemy.orm import make_transient_to_detached
+
+
+class UserCache:
+    """
+    Authenticated users keyed by their proxy headers (Remote-User, Remote-Groups).
+    Detached copies are cached and merged into each request's session without a query,
+    entries expire after ttl seconds and are dropped when a user's permission or row changes.
+    """
+    def __init__(self, db, ttl:int = 300):
+        self.db = db
+        self.ttl = ttl
+        self._users = {}
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(user):
+        """Detached copy of a user, the request's own instance stays in its session"""
+        columns = type(user).__table__.columns
+        copy = type(user)(**{column.key: getattr(user, column.key) for column in columns})
+        make_transient_to_detached(copy)
+        return copy
+
+    def _merge(self, user):
+        return self.db.session.merge(user, load=False)
+
+    def get(self, username:str, groups:str):
+        """The user for these headers in the current session, None on a miss"""
+        with self._lock:
+            entry = self._users.get((username, groups))
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(entry[1].id)
+                return None
+            user = entry[1]
+        return self._merge(user)
+
+    def get_by_id(self, user_id:int):
+        """Cached user by id for the login manager's user loader, None on a miss"""
+        with self._lock:
+            key = self._ids.get(user_id)
+            entry = self._users.get(key) if key else None
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            user = entry[1]
+        return self._merge(user)
+
+    def put(self, username:str, groups:str, user) -> None:
+        copy = self._copy(user)
+        with self._lock:
+            # A user is only cached under their latest headers
+            self._drop(copy.id)
+            self._users[(username, groups)] = (time.monotonic() + self.ttl, copy)
+            self._ids[copy.id] = (username, groups)
+
+    def _drop(self, user_id:int) -> None:
+        if (key := self._ids.pop(user_id, None)) is not None:
+            self._users.pop(key, None)
+
+    def invalidate(self, user_id:int = None) -> None:
+        """Drops a user after their row changes, or every user"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+                self._ids.clear()
+            else:
+                self._drop(user_id)
@@ -16,9 +16,10 @@ def data_table(
     columns="",
     rows="",
     custom_script='console.log("Table loaded");',
-    for_page=""
+    for_page="",
+    ajax_url=""
 ): pass
-def data_table_script(name="", script="", default_rows=25): pass
+def data_table_script(name="", script="", default_rows=25, ajax_url=""): pass
 def data_table_script_common(): pass
 def icon_heading(content="", icon="", classes="", badge=""): pass
 def script(src=""): pass
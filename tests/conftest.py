@@ -0,0 +1,26 @@
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The app on a sqlite database, it loads its config and blueprints relative to the repo root"""
+    os.chdir(ROOT)
+    os.environ["DB_URI"] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'cetadash.db'}"
+    from src import app
+    app.testing = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """A client signed in as an admin through the trusted proxy headers"""
+    return app.test_client(
+        environ_base={
+            "REMOTE_ADDR": "172.18.0.2",
+            "HTTP_REMOTE_USER": "admin",
+            "HTTP_REMOTE_GROUPS": "admins",
+        }
+    )
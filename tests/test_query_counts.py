@@ -0,0 +1,43 @@
+import pytest
+
+ROWS = 5
+
+
+def add_rows(app, model:str, count:int, **values) -> None:
+    db = app.extensions["sqlalchemy"]
+    with app.app_context():
+        cls = getattr(app.models.docker, model)
+        start = cls.query.count()
+        for i in range(start, start + count):
+            db.session.add(cls(name=f"{model} {i}", **values))
+        db.session.commit()
+
+
+def page_queries(client, url:str) -> tuple[int, int]:
+    """Queries run rendering a table page and fetching all of its rows"""
+    # Imported here, the app is only importable once the app fixture has set it up
+    from src.appsrc.modules.query_counter import count_queries
+    with count_queries() as page:
+        assert client.get(url).status_code == 200
+    with count_queries() as rows:
+        response = client.get(url, query_string={"draw": 1, "start": 0, "length": -1})
+        assert response.status_code == 200
+    return len(page), len(rows)
+
+
+@pytest.mark.parametrize(
+    "url, model, values",
+    [
+        ("/docker/workflow/scripts/", "WorkflowScript", {}),
+        ("/docker/workflow/tasks/", "WorkflowTask", {}),
+        ("/docker/workflow/workflows/", "Workflow", {}),
+        ("/docker/workflow/triggers/", "WorkflowTrigger", {"endpoint": "test"}),
+    ]
+)
+def test_index_query_count_is_constant(app, client, url, model, values):
+    # The first request creates and caches the signed in user
+    client.get(url)
+    add_rows(app, model, ROWS, **values)
+    queries = page_queries(client, url)
+    add_rows(app, model, ROWS, **values)
+    assert page_queries(client, url) == queries